@@ -0,0 +1,91 @@
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+
+from libs.Analysis import AnalysisCancelled
+
+
+class AnalysisWorker(QObject):
+    progress = pyqtSignal(int, int, str)
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, object)
+    cancelled = pyqtSignal(int)
+
+    def __init__(self, run_id, analysis):
+        super().__init__()
+        self.run_id = run_id
+        self.analysis = analysis
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            result = self.analysis.run(lambda index, stage: self.progress.emit(self.run_id, index, stage))
+        except AnalysisCancelled:
+            self.cancelled.emit(self.run_id)
+        except Exception as err:
+            self.failed.emit(self.run_id, err)
+        else:
+            self.finished.emit(self.run_id, result)
+
+    def cancel(self):
+        self.analysis.cancel()
+
+
+# Runs every analysis on its own QThread. Only the latest run reports back,
+# signals are queued to the thread owning the runner (the GUI thread).
+class AnalysisRunner(QObject):
+    progress = pyqtSignal(int, str)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+    cancelled = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.run_id = 0
+        self._running = {}
+
+    def start(self, analysis):
+        self.cancel()
+        self.run_id += 1
+        thread = QThread()
+        worker = AnalysisWorker(self.run_id, analysis)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.progress.connect(self._on_progress)
+        worker.finished.connect(self._on_finished)
+        worker.failed.connect(self._on_failed)
+        worker.cancelled.connect(self._on_cancelled)
+        for signal in (worker.finished, worker.failed, worker.cancelled):
+            signal.connect(thread.quit)
+        # Qt owns both objects until their deferred deletion, the reference is dropped once the thread is gone
+        thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        thread.destroyed.connect(lambda _=None, run_id=self.run_id: self._running.pop(run_id, None))
+        self._running[self.run_id] = (thread, worker)
+        thread.start()
+        return self.run_id
+
+    def cancel(self):
+        for _, worker in self._running.values():
+            worker.cancel()
+
+    def is_running(self):
+        return self.run_id in self._running
+
+    def wait(self):
+        for thread, _ in list(self._running.values()):
+            thread.wait()
+
+    def _on_progress(self, run_id, index, stage):
+        if run_id == self.run_id:
+            self.progress.emit(index, stage)
+
+    def _on_finished(self, run_id, result):
+        if run_id == self.run_id:
+            self.finished.emit(result)
+
+    def _on_failed(self, run_id, err):
+        if run_id == self.run_id:
+            self.failed.emit(err)
+
+    def _on_cancelled(self, run_id):
+        if run_id == self.run_id:
+            self.cancelled.emit()
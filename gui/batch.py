@@ -0,0 +1,39 @@
+import argparse
+import json
+import os
+import sys
+
+from scipy.linalg import LinAlgError
+
+from libs.Job import Job, run_job
+from libs.FactorizationCache import FactorizationCache
+from libs.MeshCache import MeshCache, default_directory
+from libs.ResultStore import ResultStore
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run bracket analyses without the GUI")
+    parser.add_argument("jobs", nargs="+", help="job descriptions (.json or .toml)")
+    parser.add_argument("-o", "--output", default="results", help="result store directory")
+    parser.add_argument("--vtu", action="store_true", help="also export <output>/<job>.vtu for ParaView")
+    parser.add_argument("--mesh-cache", default=default_directory(), help="directory for stored meshes")
+    parser.add_argument("--no-mesh-cache", action="store_true", help="always generate meshes from scratch")
+    args = parser.parse_args(argv)
+    cache = FactorizationCache()
+    meshes = None if args.no_mesh_cache else MeshCache(directory=args.mesh_cache)
+    failed = 0
+    for path in args.jobs:
+        try:
+            job = Job.load(path)
+            _, summary = run_job(job, args.output, cache, meshes)
+            if args.vtu:
+                ResultStore(args.output).read(job.name).to_vtu(os.path.join(args.output, job.name + ".vtu"))
+            print(json.dumps(summary))
+        except (ValueError, LinAlgError, OSError) as err:
+            failed += 1
+            print(f"{path}: {err}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+import argparse
+import json
+import platform
+import sys
+from time import perf_counter
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+
+from libs.QualityMesher import quality_mesh
+from libs.StiffnessData import StiffnessData, split_via_delaunay
+from libs.Finite2DGenerator import Finite2DGenerator
+from libs.MeshPlot import MeshPlot
+
+default_bracket = [[1700, 550], [2200, 560], [2600, 580], [3200, 600], [3200, 900], [200, 900], [200, 600], [800, 580],
+                   [1200, 560]]
+default_bracket2 = [[200, 900], [200, 750], [1700, 550], [3200, 750], [3200, 900]]
+bracket_sizes = [400, 200, 100, 50, 20, 10, 6]
+synthetic_nodes = [100, 1000, 10000, 100000]
+dense_limit = 200  # DOFs, the dense assembly is O(N^2 E) with shapely comparisons
+
+
+def synthetic_points(n_nodes, width=3000.0, height=300.0):
+    nx = max(2, int(round(np.sqrt(n_nodes * width / height))))
+    ny = max(2, int(round(n_nodes / nx)))
+    x, y = np.meshgrid(np.linspace(0, width, nx), np.linspace(0, height, ny))
+    return np.column_stack([x.ravel(), y.ravel()]).tolist(), width, height
+
+
+def timed(results, stage, repeat, func):
+    best = np.inf
+    value = None
+    for _ in range(repeat):
+        start = perf_counter()
+        value = func()
+        best = min(best, perf_counter() - start)
+    results[stage] = best
+    return value
+
+
+def material(data):
+    data.young, data.poisson, data.thickness = 2e11, 0.3, 0.01
+
+
+def bracket_case(size, repeat):
+    times = {}
+    parts = (default_bracket, default_bracket2)
+    # the mesher the pipeline runs by default, on its own and with the rest of the meshing around it
+    defaults = StiffnessData()
+    if defaults.mesher == "quality":
+        timed(times, "quality_mesh", repeat, lambda: quality_mesh(parts, size, defaults.min_angle))
+    else:
+        timed(times, "split_via_delaunay", repeat, lambda: split_via_delaunay(default_bracket.copy(), size))
+
+    def mesh():
+        # a fresh StiffnessData every time, so no repeat works on an existing mesh
+        data = StiffnessData()
+        material(data)
+        data.define_nodes_mesh_by_parts(size, *parts)
+        return data
+
+    data = timed(times, "define_nodes_mesh_by_parts", repeat, mesh)
+    points = np.column_stack([data.get_tri_x(), data.get_tri_y()]).tolist()
+    timed(times, "create_nodes", repeat, lambda: data.create_nodes(points))
+    data.set_fixing(default_bracket[5])
+    data.set_fixing(default_bracket[4])
+    data.set_load(default_bracket[3], 6000)
+    data.set_load(default_bracket[2], 6000)
+    return generator_case(data, times, repeat)
+
+
+def synthetic_case(n_nodes, repeat):
+    times = {}
+    points, width, height = synthetic_points(n_nodes)
+
+    def mesh():
+        data = StiffnessData()
+        material(data)
+        data.define_nodes_mesh(points, None, False)
+        return data
+
+    data = timed(times, "define_nodes_mesh", repeat, mesh)
+    timed(times, "create_nodes", repeat, lambda: data.create_nodes(points))
+    xy = data.mesh.coords
+    for i in np.flatnonzero(xy[:, 0] == 0):
+        data.set_fixing(xy[i])
+    data.set_load([width, height], 6000)
+    return generator_case(data, times, repeat)
+
+
+def generator_case(data, times, repeat):
+    fg = Finite2DGenerator(data)
+    if fg.m_s <= dense_limit:
+        timed(times, "get_stiffness_matrix", 1, fg.get_stiffness_matrix)
+    timed(times, "get_sparse_stiffness_matrix", repeat, lambda: Finite2DGenerator(data).get_sparse_stiffness_matrix())
+    timed(times, "calculate_moving", repeat, lambda: Finite2DGenerator(data).calculate_moving())
+    fg.calculate_moving()
+    timed(times, "calculate_stress", repeat, fg.calculate_stress)
+    figure = plt.figure()
+    moving = np.abs(fg.calculated_moving.reshape((-1, fg.dimension))).sum(axis=1)[data.raw_to_sorted]
+    timed(times, "draw_field", 1, lambda: MeshPlot(figure).draw_field(data.get_tri_x(), data.get_tri_y(),
+                                                                       data.tri.simplices, moving))
+    plt.close(figure)
+    return {"nodes": data.mesh.n_nodes, "elements": data.mesh.n_elements, "dofs": fg.m_s, "times": times}
+
+
+def run(sizes, nodes, repeat):
+    cases = {}
+    for size in sizes:
+        cases[f"bracket/{size:g}"] = bracket_case(size, repeat)
+        print(f"bracket/{size:g}", json.dumps(cases[f"bracket/{size:g}"]), file=sys.stderr)
+    for n in nodes:
+        cases[f"synthetic/{n}"] = synthetic_case(n, repeat)
+        print(f"synthetic/{n}", json.dumps(cases[f"synthetic/{n}"]), file=sys.stderr)
+    return {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+            "repeat": repeat, "cases": cases}
+
+
+def compare(old, new, threshold, min_time):
+    regressions = []
+    for name, case in new["cases"].items():
+        if name not in old["cases"]:
+            continue
+        for stage, t in case["times"].items():
+            before = old["cases"][name]["times"].get(stage)
+            if before is None:
+                continue
+            ratio = t / before if before > 0 else np.inf
+            flag = "REGRESSION" if ratio > threshold and t > min_time else ""
+            print(f"{name:20} {stage:28} {before:10.4f} {t:10.4f} {ratio:6.2f}x {flag}")
+            if flag:
+                regressions.append((name, stage, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark meshing, assembly, solve and post-processing")
+    parser.add_argument("-o", "--output", default="benchmark.json")
+    parser.add_argument("--sizes", nargs="*", type=float, default=bracket_sizes)
+    parser.add_argument("--nodes", nargs="*", type=int, default=synthetic_nodes)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio flagged as a regression")
+    parser.add_argument("--min-time", type=float, default=0.05, help="stages faster than this are never flagged")
+    args = parser.parse_args(argv)
+    if args.compare:
+        with open(args.compare[0]) as f:
+            old = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        return 1 if compare(old, new, args.threshold, args.min_time) else 0
+    result = run(args.sizes, args.nodes, args.repeat)
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+import numpy as np
+
+
+# running count of the nodes added by bisecting the elements in order, a shared edge counts once
+def added_nodes(simplices):
+    s = np.asarray(simplices).reshape((-1, 3))
+    edges = np.sort(np.stack([s[:, [0, 1]], s[:, [1, 2]], s[:, [0, 2]]], axis=1), axis=2).reshape((-1, 2))
+    _, first = np.unique(edges, axis=0, return_index=True)
+    return np.cumsum(np.bincount(first // 3, minlength=len(s)))
+
+
+class AdaptiveRefinement:
+    def __init__(self, target=0.05, max_dofs=50000, max_steps=8):
+        self.target = target
+        self.max_dofs = max_dofs
+        self.max_steps = max_steps
+        self.steps = []
+
+    # Zienkiewicz-Zhu criterion: an element is refined when its error exceeds the share it would have
+    # if the target error was spread evenly over the mesh
+    def flag(self, fg):
+        allowed = self.target * np.sqrt((fg.energy + np.sum(fg.element_error ** 2)) / len(fg.element_error))
+        flagged = np.flatnonzero(fg.element_error > allowed)
+        return flagged[np.argsort(fg.element_error[flagged])[::-1]]
+
+    # solve() runs the analysis on the current mesh of data and returns its generator
+    def run(self, data, fg, solve):
+        self.steps = []
+        while True:
+            fg.estimate_error()
+            self.steps.append({"step": len(self.steps), "nodes": data.mesh.n_nodes, "elements": data.mesh.n_elements,
+                               "dofs": data.mesh.n_dofs, "error": fg.relative_error})
+            if fg.relative_error <= self.target or len(self.steps) > self.max_steps:
+                return fg
+            flagged = self.flag(fg)
+            # every bisected edge adds a node, drop the smallest errors until the refined mesh fits the budget
+            added = added_nodes(np.asarray(data.tri.simplices)[flagged])
+            budget = (self.max_dofs - data.mesh.n_dofs) // data.mesh.dimension
+            flagged = flagged[:np.searchsorted(added, budget, side="right")]
+            if len(flagged) == 0:
+                return fg
+            # the remesh adds nodes of its own; a refinement over the budget is undone and tried again
+            # with the worse half of the elements
+            state = data.mesh_state()
+            data.refine(flagged)
+            while data.mesh.n_dofs > self.max_dofs:
+                data.restore_state(state)
+                flagged = flagged[:len(flagged) // 2]
+                if len(flagged) == 0:
+                    return fg
+                data.refine(flagged)
+            fg = solve()
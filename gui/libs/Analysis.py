@@ -0,0 +1,85 @@
+import numpy as np
+
+from libs.StiffnessData import StiffnessData
+from libs.Finite2DGenerator import Finite2DGenerator
+from libs.Substructure import Substructuring
+
+stages = ("mesh", "assemble", "solve", "post-process")
+
+
+class AnalysisCancelled(Exception):
+    pass
+
+
+class AnalysisResult:
+    def __init__(self, data, generator, refinement=None):
+        self.data = data
+        self.generator = generator
+        self.refinement = refinement
+        self.moving = generator.calculated_moving
+        self.max_moving = np.abs(self.moving).max()
+        self.max_strain = np.abs(generator.strain).max()
+        self.max_stress = generator.von_mises.max()
+
+
+class Analysis:
+    def __init__(self, young, poisson, thickness, size, parts, fixings, loads, load_value, angle=55,
+                 solver="splu", factorization_cache=None, mesh_cache=None, refinement=None, element="t3",
+                 substructuring=False, **solver_options):
+        self.young, self.poisson, self.thickness = young, poisson, thickness
+        self.size = size
+        self.parts = parts
+        self.fixings = fixings
+        self.loads = loads
+        self.load_value = load_value
+        self.angle = angle
+        self.solver = solver
+        self.solver_options = solver_options
+        self.factorization_cache = factorization_cache
+        self.mesh_cache = mesh_cache
+        self.refinement = refinement
+        self.element = element
+        self.substructuring = substructuring
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self, progress=None):
+        self._stage(0, progress)
+        data = StiffnessData()
+        data.poisson, data.young, data.thickness = self.poisson, self.young, self.thickness
+        data.mesh_cache = self.mesh_cache
+        data.element = self.element
+        data.define_nodes_mesh_by_parts(self.size, *self.parts)
+        fg = self._solve(data, progress)
+        if self.refinement is not None:
+            fg = self.refinement.run(data, fg, lambda: self._solve(data, progress))
+        return AnalysisResult(data, fg, self.refinement)
+
+    def _solve(self, data, progress):
+        for point in self.fixings:
+            data.set_fixing(point)
+        for point in self.loads:
+            data.set_load(point, self.load_value, self.angle)
+        self._stage(1, progress)
+        fg = Finite2DGenerator(data, self.solver, self.factorization_cache, **self.solver_options)
+        if self.substructuring:
+            # condensed parts are kept in the factorization cache, next to whole-model factorizations
+            self._stage(2, progress)
+            Substructuring(fg, cache=self.factorization_cache, solver=self.solver,
+                           **self.solver_options).calculate_moving()
+        else:
+            if fg.lookup_factorization() is None:
+                fg.get_sparse_stiffness_matrix()
+            self._stage(2, progress)
+            fg.calculate_moving()
+        self._stage(3, progress)
+        fg.calculate_stress()
+        return fg
+
+    def _stage(self, index, progress):
+        if self.cancelled:
+            raise AnalysisCancelled(stages[index])
+        if progress is not None:
+            progress(index, stages[index])
@@ -0,0 +1,14 @@
+import hashlib
+
+import numpy as np
+
+
+# sha1 over the dtype, shape and bytes of every array, callers add their own fields before hexdigest()
+def array_digest(*arrays):
+    digest = hashlib.sha1()
+    for arr in arrays:
+        arr = np.ascontiguousarray(arr)
+        digest.update(str(arr.dtype).encode())
+        digest.update(str(arr.shape).encode())
+        digest.update(arr.tobytes())
+    return digest
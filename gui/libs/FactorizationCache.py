@@ -0,0 +1,64 @@
+from collections import OrderedDict
+from threading import RLock
+
+import numpy as np
+
+from libs.Digest import array_digest
+
+
+def factorization_key(coords, triangles, d, h, fixed, solver):
+    digest = array_digest(coords, triangles, d, np.float64(h), np.unique(fixed))
+    digest.update(solver.name.encode())
+    digest.update(repr(sorted(solver.options().items())).encode())
+    return digest.hexdigest()
+
+
+class Factorization:
+    def __init__(self, key, solver, free, size):
+        self.key = key
+        self.solver = solver
+        self.free = free
+        self.size = size
+
+    def solve(self, loads):
+        return self.solver.solve(loads[self.free])
+
+
+class FactorizationCache:
+    def __init__(self, maxsize=4):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = RLock()
+
+    def get(self, key):
+        with self._lock:
+            factorization = self._entries.get(key)
+            if factorization is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return factorization
+
+    def put(self, factorization):
+        with self._lock:
+            self._entries[factorization.key] = factorization
+            self._entries.move_to_end(factorization.key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return factorization
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
@@ -1,24 +1,56 @@
 from libs.TriangleStiffness import *
 from libs.StiffnessData import StiffnessData
-import scipy.linalg as sl
-import matplotlib.tri as mtri
+from libs.LinearSolver import make_solver
+from libs.FactorizationCache import Factorization, factorization_key
+from libs.LoadCase import LoadCaseResults
+import scipy.sparse as sp
 
 
 class Finite2DGenerator:
-    def __init__(self, data: StiffnessData):
+    def __init__(self, data: StiffnessData, solver="splu", factorization_cache=None, **solver_options):
         self.dimension = 2
+        self.solver = make_solver(solver, **solver_options)
+        self.factorization_cache = factorization_cache
+        self.factorization = None
         self.data = data
-        self.sorted_nodes = data.nodes
-        self.stiffness_elements = self._extract_triangles(self.data.get_raw_nodes(), self.data.tri.simplices)
-        self.m_s = len(self.sorted_nodes) * self.dimension
+        self.report = data.report
+        self.mesh = data.mesh
+        self._stiffness_elements = None
+        self.coords = self.mesh.coords
+        self.triangles = self.mesh.triangles
+        self.m_s = self.mesh.n_dofs
         self.stiffness_matrix = None
+        self.sparse_stiffness_matrix = None
         self.calculated_loads = None
         self.calculated_moving = None
         self.moving_indexes = None
         self.__calc_load = None
         self.D, self.h = self.data.d(), self.data.thickness
+        self._element_stiffness = None
+        self._element_b = None
+        self.strain = None
+        self.stress = None
+        self.von_mises = None
+        self.nodal_stress = None
+        self.nodal_von_mises = None
+        self.element_stress = None
+        self.element_error = None
+        self.energy = None
+        self.relative_error = None
+
+    @property
+    def sorted_nodes(self):
+        return self.data.nodes
+
+    @property
+    def stiffness_elements(self):
+        if self._stiffness_elements is None:
+            self._stiffness_elements = self._extract_triangles(self.data.get_raw_nodes(), self.data.tri.simplices)
+        return self._stiffness_elements
 
     def get_stiffness_matrix(self):
+        if self.mesh.order == 2:
+            raise ValueError("The dense assembly supports linear triangles only, use get_sparse_stiffness_matrix")
         col_size = self.m_s // len(self.sorted_nodes)
         row_num = 0
         self.__calc_load = set()
@@ -30,8 +62,33 @@ class Finite2DGenerator:
             row_num += self.dimension
         return self.stiffness_matrix
 
-    def calculate_moving(self):
-        g_matrix = self.get_stiffness_matrix()
+    def get_element_matrices(self):
+        if self._element_stiffness is None:
+            stiffness = batch_stiffness_quadratic if self.mesh.order == 2 else batch_stiffness
+            self._element_stiffness, self._element_b = stiffness(self.triangles, self.coords, self.D, self.h)
+        return self._element_stiffness, self._element_b
+
+    def get_element_dofs(self):
+        return self.mesh.element_dofs()
+
+    def get_sparse_stiffness_matrix(self):
+        with self.report.stage("assemble", elements=self.mesh.n_elements, dofs=self.m_s) as stage:
+            self.sparse_stiffness_matrix = self.assemble()
+            stage.info["nnz"] = self.sparse_stiffness_matrix.nnz
+        return self.sparse_stiffness_matrix
+
+    # global matrix of the given elements only, all of them by default
+    def assemble(self, elements=None):
+        dofs = self.get_element_dofs()
+        values, _ = self.get_element_matrices()
+        if elements is not None:
+            dofs, values = dofs[elements], values[elements]
+        size = dofs.shape[1]
+        rows = np.repeat(dofs, size, axis=1)
+        cols = np.tile(dofs, (1, size))
+        return sp.coo_matrix((values.ravel(), (rows.ravel(), cols.ravel())), shape=(self.m_s, self.m_s)).tocsr()
+
+    def get_fixed_indexes(self):
         indexes = []
         index = 0
         for p, m in zip(self.data.loads, self.data.moving):
@@ -40,54 +97,130 @@ class Finite2DGenerator:
             elif np.isnan(p[0]) or m[0] == 0:
                 raise ValueError("p = " + str(p) + " m = " + str(m))
             index += 1
-        a = np.delete(np.delete(g_matrix, indexes, 0), indexes, 1)
-        b = np.delete(self.data.loads, indexes).reshape((-1, 1))
+        return np.array(indexes, dtype=np.int64)
+
+    def lookup_factorization(self):
+        if self.factorization is None and self.factorization_cache is not None:
+            key = factorization_key(self.coords, self.triangles, self.D, self.h, self.get_fixed_indexes(), self.solver)
+            self.factorization = self.factorization_cache.get(key)
+        return self.factorization
+
+    def factorize(self):
+        indexes = self.get_fixed_indexes()
+        key = factorization_key(self.coords, self.triangles, self.D, self.h, indexes, self.solver)
+        cache = self.factorization_cache
+        factorization = self.factorization if self.factorization is not None and self.factorization.key == key \
+            else cache.get(key) if cache is not None else None
+        if factorization is None:
+            to_paste = np.setdiff1d(np.arange(self.m_s), indexes)
+            g_matrix = self.sparse_stiffness_matrix
+            if g_matrix is None:
+                g_matrix = self.get_sparse_stiffness_matrix()
+            with self.report.stage("factorize", solver=self.solver.name) as stage:
+                self.solver.factorize(g_matrix[to_paste][:, to_paste])
+                stage.info.update(self.solver_stats())
+            factorization = Factorization(key, self.solver, to_paste, self.m_s)
+            if cache is not None:
+                cache.put(factorization)
+        self.solver = factorization.solver
+        self.factorization = factorization
+        return factorization
+
+    def calculate_moving(self):
+        factorization = self.factorize()
+        with self.report.stage("solve", dofs=len(factorization.free), cases=1) as stage:
+            x = factorization.solve(self.data.loads)
+            stage.info.update(self.solver_stats("iterations", "converged"))
         self.calculated_moving = self.data.moving.copy()
-        to_paste = [i for i in range(len(self.data.moving)) if i not in indexes]
-        x = sl.solve(a, b)
-        for i, v in zip(to_paste, x):
-            self.calculated_moving[i] = v
-        self.moving_indexes = to_paste
+        self.calculated_moving[factorization.free] = x.reshape((-1, 1))
+        self.moving_indexes = factorization.free.tolist()
         return self.calculated_moving
 
+    def calculate_load_cases(self, cases):
+        factorization = self.factorize()
+        with self.report.stage("solve", dofs=len(factorization.free), cases=len(cases)) as stage:
+            x = factorization.solve(self.data.get_load_matrix(cases))
+            stage.info.update(self.solver_stats("iterations", "converged"))
+        moving = np.zeros((self.m_s, len(cases)), dtype=np.float64)
+        moving[factorization.free] = x.reshape((len(factorization.free), len(cases)))
+        return LoadCaseResults(cases, moving, self.dimension)
+
     def _append_to_matrix(self, elements, indexes, r, col_size):
         col = 0
-        col_nums = [0 for _ in indexes]
         rows = [e.get_stiffness_matrix(self.D, self.h)[i*col_size:i*col_size+col_size] for e, i in zip(elements, indexes)]
         for node in self.sorted_nodes:
             temp = np.zeros((col_size, col_size))
             for i in self._get_node_in_element_indexes(node, elements):
-                temp += rows[i][:, col_nums[i]:col_nums[i] + col_size]
-                col_nums[i] += col_size
+                c = elements[i].nodes.index(node) * col_size
+                temp += rows[i][:, c:c + col_size]
             self.stiffness_matrix[r: r + self.dimension, col: col + col_size] += temp
             col += col_size
 
-    def calculate_stress(self):
-        col_size = self.m_s // len(self.sorted_nodes)
-        row_num = 0
-        stress = []
-        for node in self.sorted_nodes:
-            elements = [e for e in self.stiffness_elements if node in e.nodes]
-            indexes = [e.nodes.index(node) for e in elements]
-            self._stress_append(elements, indexes, stress, col_size)
-            row_num += self.dimension
-        return stress
+    def calculate_stress(self, moving=None):
+        moving = self.calculated_moving if moving is None else moving
+        with self.report.stage("stress", elements=self.mesh.n_elements):
+            _, b = self.get_element_matrices()
+            u = np.asarray(moving, dtype=np.float64).reshape(-1)[self.get_element_dofs()]
+            if self.mesh.order == 2:
+                # the strain is linear in the element: its mean over the Gauss points is the element value,
+                # the recovery takes it at the nodes
+                self.strain = np.einsum('epij,ej->ei', b, u) / b.shape[1]
+                b_nodes, _ = quadratic_strain_matrices(self.triangles, self.coords, quadratic_nodes)
+                self.element_stress = np.einsum('epij,ej->epi', b_nodes, u) @ self.D.T
+            else:
+                self.strain = np.einsum('eij,ej->ei', b, u)
+                self.element_stress = np.repeat((self.strain @ self.D.T)[:, None], 3, axis=1)
+            self.stress = self.strain @ self.D.T
+            self.von_mises = von_mises(self.stress)
+            self.nodal_stress = self.get_nodal_average(self.element_stress, per_node=True)
+            self.nodal_von_mises = self.get_nodal_average(von_mises(self.element_stress), per_node=True)
+        return self.stress
 
-    def _stress_append(self, elements, indexes, arr, col_size):
-        col = 0
-        col_nums = [0 for _ in indexes]
-        rows = [e.get_stiffness_matrix(self.D, self.h)[i * col_size:i * col_size + col_size] for e, i in
-                zip(elements, indexes)]
-        cc = 0
-        for node in self.sorted_nodes:
-            temp = np.zeros((col_size, col_size))
-            for i in self._get_node_in_element_indexes(node, elements):
-                temp += rows[i][:, col_nums[i]:col_nums[i] + col_size] @ self.calculated_moving[cc: cc+2]
-                col_nums[i] += col_size
-                cc += 2
-            cc = 0
-            arr.append(temp)
-            col += col_size
+    # Zienkiewicz-Zhu estimate: the smoothed nodal stresses stand in for the exact field, the error of an
+    # element is the energy norm of their difference from its constant stress
+    def estimate_error(self):
+        if self.stress is None:
+            self.calculate_stress()
+        with self.report.stage("estimate", elements=self.mesh.n_elements) as stage:
+            # both fields are taken at the edge midpoints, the rule is exact for linear elements
+            if self.mesh.order == 2:
+                recovered = self.nodal_stress[self.triangles[:, 3:]]
+            else:
+                recovered = self.nodal_stress[self.triangles]
+                recovered = (recovered + np.roll(recovered, -1, axis=1)) / 2
+            local = self.element_stress[:, -3:]
+            difference = recovered - local
+            compliance = np.linalg.inv(self.D)
+            volume = self.h * triangle_areas(self.triangles, self.coords)
+            error = volume * np.einsum('eqi,ij,eqj->e', difference, compliance, difference) / 3
+            self.energy = float(np.sum(volume * np.einsum('eqi,ij,eqj->e', local, compliance, local) / 3))
+            self.element_error = np.sqrt(error)
+            self.relative_error = float(np.sqrt(error.sum() / (error.sum() + self.energy)))
+            stage.info["relative_error"] = self.relative_error
+        return self.element_error
+
+    def solver_stats(self, *keys):
+        # iterative solvers keep per right hand side lists of the last solve, the report sums them up;
+        # residual histories are per iteration and left out
+        summary = {"iterations": sum, "converged": all}
+        return {k: summary.get(k, lambda v: v)(v) for k, v in self.solver.stats.items()
+                if k != "residuals" and (not keys or k in keys)}
+
+    # values are given per element, or per element node with per_node
+    def get_nodal_average(self, values, per_node=False):
+        values = np.asarray(values, dtype=np.float64)
+        n = self.triangles.shape[1]
+        if not per_node:
+            values = np.repeat(values[:, None], n, axis=1)
+        weights = np.repeat(triangle_areas(self.triangles, self.coords), n)
+        nodes = self.triangles.ravel()
+        flat = values.reshape((len(nodes), -1))
+        total = np.zeros((len(self.coords), flat.shape[1]), dtype=np.float64)
+        np.add.at(total, nodes, flat * weights[:, None])
+        area = np.bincount(nodes, weights=weights, minlength=len(self.coords))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            total /= area[:, None]
+        return total.reshape((len(self.coords),) + values.shape[2:])
 
     @staticmethod
     def _get_node_in_element_indexes(node, elements):
@@ -105,18 +238,3 @@ class Finite2DGenerator:
         for coords in simplices:
             triangles.append(TriangleStiffness(nodes[coords[0]], nodes[coords[1]], nodes[coords[2]]))
         return triangles
-
-    def draw(self, axis):
-        axis.triplot(self.data.get_tri_x(), self.data.get_tri_y(), self.data.tri.simplices)
-        axis.plot(self.data.get_tri_x(), self.data.get_tri_y(), 'o')
-
-    def draw_displaced(self, axis):
-        cn = self.data.get_raw_nodes()
-        sc = []
-        for n in cn:
-            i = self.data.nodes.index(n)
-            sc.append(np.abs(self.calculated_moving[2 * i][0]) + np.abs(self.calculated_moving[2 * i + 1][0]))
-        triangulation = mtri.Triangulation(self.data.get_tri_x(), self.data.get_tri_y(), self.data.tri.simplices)
-        axis.triplot(triangulation, '-k')
-        axis.tricontourf(triangulation, sc)
-
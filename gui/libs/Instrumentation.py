@@ -0,0 +1,70 @@
+import os
+import tracemalloc
+from contextlib import contextmanager
+from time import perf_counter
+
+
+def instrumentation_enabled():
+    return os.environ.get("FEM_INSTRUMENT", "").lower() in ("1", "true", "yes", "on")
+
+
+class StageRecord:
+    def __init__(self, name, info):
+        self.name = name
+        self.info = info
+        self.time = 0.0
+        self.peak_memory = 0
+        self._start_memory = 0
+        self._peak = 0
+
+    def as_dict(self):
+        return {"stage": self.name, "time": self.time, "peak_memory": self.peak_memory, **self.info}
+
+
+class Report:
+    def __init__(self, enabled=None):
+        self.enabled = instrumentation_enabled() if enabled is None else enabled
+        self.records = []
+        self._stack = []
+
+    # nested stages fold their peak into the parent, so resetting the tracemalloc peak is safe;
+    # before Python 3.9 the peak cannot be reset and stages report the peak since tracing started
+    @contextmanager
+    def stage(self, name, **info):
+        record = StageRecord(name, info)
+        if not self.enabled:
+            yield record
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            self._stack[-1]._peak = max(self._stack[-1]._peak, peak)
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        record._start_memory = record._peak = current
+        self._stack.append(record)
+        start = perf_counter()
+        try:
+            yield record
+        finally:
+            record.time = perf_counter() - start
+            record._peak = max(record._peak, tracemalloc.get_traced_memory()[1])
+            record.peak_memory = record._peak - record._start_memory
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1]._peak = max(self._stack[-1]._peak, record._peak)
+            self.records.append(record)
+
+    def clear(self):
+        self.records = []
+
+    def as_dict(self):
+        return [r.as_dict() for r in self.records]
+
+    def __str__(self):
+        lines = []
+        for r in self.records:
+            info = ", ".join(f"{k}: {v}" for k, v in r.info.items())
+            lines.append(f"{r.name}: {r.time * 1000:.1f} мс, {r.peak_memory / 2 ** 20:.2f} МБ" + (f" ({info})" if info else ""))
+        return "\n".join(lines)
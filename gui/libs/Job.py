@@ -0,0 +1,130 @@
+import json
+import os
+from time import perf_counter
+
+from libs.Analysis import Analysis
+from libs.AdaptiveRefinement import AdaptiveRefinement
+from libs.LinearSolver import make_solver
+from libs.ResultStore import ResultStore
+from libs.StiffnessData import elements
+
+
+# AdaptiveRefinement options and their types
+refinement_options = {"target": float, "max_dofs": int, "max_steps": int}
+
+
+# tomllib is in the standard library from Python 3.11, older interpreters need the tomli package
+def toml_parser():
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            raise ValueError("Reading .toml jobs needs Python 3.11 or the tomli package") from None
+    return tomllib
+
+
+class Job:
+    def __init__(self, name, parts, size, young, poisson, thickness, fixings, load_nodes, load_value, angle=55,
+                 solver="splu", solver_options=None, refinement=None, element="t3",
+                 substructuring=False):
+        self.name = name
+        self.parts = parts
+        self.size = size
+        self.young = young
+        self.poisson = poisson
+        self.thickness = thickness  # mm, as entered in the GUI
+        self.fixings = fixings
+        self.load_nodes = load_nodes
+        self.load_value = load_value
+        self.angle = angle
+        self.solver = solver
+        self.solver_options = solver_options or {}
+        self.refinement = refinement  # AdaptiveRefinement options, None for a uniform mesh
+        self.element = element
+        self.substructuring = substructuring  # condense every part to the interface between them
+
+    @staticmethod
+    def from_dict(job, name="job"):
+        try:
+            solver = job.get("solver", {})
+            refinement = job["mesh"].get("refinement")
+            if refinement is not None and not isinstance(refinement, dict):
+                raise ValueError(f"Job {name}: mesh.refinement must be a table of options, not {refinement!r}")
+            unknown = set(refinement or {}) - set(refinement_options)
+            if unknown:
+                raise ValueError(f"Job {name}: unknown mesh.refinement options {sorted(unknown)}")
+            if refinement is not None:
+                try:
+                    refinement = {k: refinement_options[k](v) for k, v in refinement.items()}
+                except (TypeError, ValueError):
+                    raise ValueError(f"Job {name}: invalid mesh.refinement options {refinement!r}") from None
+            element = job["mesh"].get("element", "t3")
+            if element not in elements:
+                raise ValueError(f"Job {name}: unknown mesh.element {element!r}, expected one of {', '.join(elements)}")
+            options = solver.get("options", {})
+            if not isinstance(options, dict):
+                raise ValueError(f"Job {name}: solver.options must be a table of options, not {options!r}")
+            # a solver built once here turns misspelled options into an error of this job, not of the run
+            try:
+                make_solver(solver.get("name", "splu"), **options)
+            except TypeError:
+                raise ValueError(f"Job {name}: invalid solver.options {options!r}") from None
+            except ValueError as err:
+                raise ValueError(f"Job {name}: {err}") from None
+            return Job(job.get("name", name), job["geometry"]["parts"], float(job["mesh"]["size"]),
+                       float(job["material"]["young"]), float(job["material"]["poisson"]),
+                       float(job["material"]["thickness"]), job["fixings"], job["load"]["nodes"],
+                       float(job["load"]["magnitude"]), float(job["load"].get("angle", 55)),
+                       solver.get("name", "splu"), options, refinement,
+                       element, bool(solver.get("substructuring", False)))
+        except KeyError as err:
+            raise ValueError(f"Job {name} has no {err}")
+
+    @staticmethod
+    def load(path):
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path, "rb") as f:
+            if path.endswith(".toml"):
+                return Job.from_dict(toml_parser().load(f), name)
+            return Job.from_dict(json.load(f), name)
+
+    def analysis(self, factorization_cache=None, mesh_cache=None):
+        return Analysis(self.young, self.poisson, self.thickness / 1000.0, self.size, self.parts, self.fixings,
+                        self.load_nodes, self.load_value, self.angle, self.solver, factorization_cache,
+                        mesh_cache,
+                        AdaptiveRefinement(**self.refinement) if self.refinement is not None else None,
+                        self.element, self.substructuring, **self.solver_options)
+
+
+def run_job(job, output=None, factorization_cache=None, mesh_cache=None):
+    started = []
+    start = perf_counter()
+    result = job.analysis(factorization_cache, mesh_cache).run(lambda index, stage: started.append((stage, perf_counter())))
+    end = perf_counter()
+    # adaptive runs go through the solution stages once per refinement step
+    stages = {}
+    for (stage, time), (_, next_time) in zip(started, started[1:] + [(None, end)]):
+        stages[stage] = stages.get(stage, 0.0) + next_time - time
+    summary = {
+        "name": job.name,
+        "nodes": int(result.data.mesh.n_nodes),
+        "elements": int(result.data.mesh.n_elements),
+        "max_moving": float(result.max_moving),
+        "max_strain": float(result.max_strain),
+        "max_stress": float(result.max_stress),
+        "time": end - start,
+        "stages": stages,
+    }
+    if result.refinement is not None:
+        summary["refinement"] = result.refinement.steps
+    if result.data.report.enabled:
+        summary["report"] = result.data.report.as_dict()
+    if output is not None:
+        write_result(result, output, job.name, summary)
+    return result, summary
+
+
+def write_result(result, output, name, summary):
+    return ResultStore(output).write_generator(name, result.generator, summary)
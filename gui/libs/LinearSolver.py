@@ -0,0 +1,241 @@
+import numpy as np
+import scipy.linalg as sl
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+from scipy.linalg import LinAlgError
+
+
+# pivots this far below the largest one mean the model is not held against rigid body motion, the
+# factorization then succeeds in floating point but the displacements are those of a mechanism
+pivot_tolerance = 1e-10
+
+
+def check_pivots(pivots):
+    pivots = np.abs(pivots)
+    if len(pivots) and pivots.min() <= pivot_tolerance * pivots.max():
+        raise LinAlgError("Matrix is singular, the model is not fixed against rigid body motion")
+
+
+class LinearSolver:
+    name = None
+    sparse = True
+
+    def __init__(self):
+        self.stats = {}
+
+    def factorize(self, a):
+        raise NotImplementedError
+
+    def solve(self, b):
+        raise NotImplementedError
+
+    def __call__(self, a, b):
+        return self.factorize(a).solve(b)
+
+    def options(self):
+        return {k: v for k, v in vars(self).items() if not k.startswith("_") and k != "stats"}
+
+
+class DenseSolver(LinearSolver):
+    name = "dense"
+    sparse = False
+
+    def __init__(self):
+        super().__init__()
+        self._factor = None
+        self._lu = None
+        self._a = None
+
+    def factorize(self, a):
+        self._a = a.toarray() if sp.issparse(a) else np.asarray(a)
+        try:
+            self._factor, self._lu = sl.cho_factor(self._a), None
+        except LinAlgError:
+            self._factor, self._lu = None, sl.lu_factor(self._a)
+        check_pivots(np.diag(self._factor[0]) ** 2 if self._factor is not None else np.diag(self._lu[0]))
+        self.stats = {"n": self._a.shape[0], "nnz": int(np.count_nonzero(self._a))}
+        return self
+
+    def solve(self, b):
+        if self._factor is not None:
+            return sl.cho_solve(self._factor, b)
+        return sl.lu_solve(self._lu, b)
+
+
+class SparseLUSolver(LinearSolver):
+    name = "splu"
+
+    def __init__(self, ordering="MMD_AT_PLUS_A"):
+        super().__init__()
+        self.ordering = ordering
+        self._lu = None
+
+    def factorize(self, a):
+        a = sp.csc_matrix(a)
+        try:
+            self._lu = spla.splu(a, permc_spec=self.ordering, diag_pivot_thresh=0.0,
+                                 options={"SymmetricMode": True})
+        except RuntimeError as err:
+            raise LinAlgError(str(err))
+        check_pivots(self._lu.U.diagonal())
+        self.stats = {"n": a.shape[0], "nnz": a.nnz, "fill": self._lu.L.nnz + self._lu.U.nnz,
+                      "ordering": self.ordering}
+        return self
+
+    def solve(self, b):
+        x = self._lu.solve(np.asarray(b, dtype=np.float64))
+        if not np.all(np.isfinite(x)):
+            raise LinAlgError("Matrix is singular")
+        return x
+
+
+class SparseDirectSolver(LinearSolver):
+    name = "spsolve"
+
+    def __init__(self, ordering="MMD_AT_PLUS_A"):
+        super().__init__()
+        self.ordering = ordering
+        self._a = None
+
+    def factorize(self, a):
+        self._a = sp.csc_matrix(a)
+        self.stats = {"n": self._a.shape[0], "nnz": self._a.nnz, "ordering": self.ordering}
+        return self
+
+    def solve(self, b):
+        x = spla.spsolve(self._a, np.asarray(b, dtype=np.float64), permc_spec=self.ordering)
+        x = np.asarray(x).reshape(np.shape(b))
+        # there are no pivots to look at, a singular system shows in the residual
+        residual = np.linalg.norm(self._a @ x.reshape((len(x), -1)) - np.reshape(b, (len(x), -1)))
+        if not np.all(np.isfinite(x)) or residual > 1e-6 * np.linalg.norm(b):
+            raise LinAlgError("Matrix is singular, the model is not fixed against rigid body motion")
+        return x
+
+
+def jacobi_preconditioner(a):
+    diagonal = a.diagonal()
+    if np.any(diagonal <= 0):
+        raise LinAlgError("Matrix is not positive definite")
+    inverse = 1.0 / diagonal
+    return lambda r: inverse * r
+
+
+def block_jacobi_preconditioner(a, size=2):
+    # nodal blocks: fixings remove both DOFs of a node, so the reduced system keeps (x, y) pairs together
+    n = a.shape[0]
+    m = n - n % size
+    a11, a22 = a.diagonal()[0:m:2], a.diagonal()[1:m:2]
+    a12, a21 = a.diagonal(1)[0:m:2], a.diagonal(-1)[0:m:2]
+    det = a11 * a22 - a12 * a21
+    if np.any(det <= 0) or np.any(a11 <= 0):
+        raise LinAlgError("Matrix is not positive definite")
+    tail = 1.0 / a.diagonal()[m:]
+
+    def apply(r):
+        z = np.empty_like(r)
+        r1, r2 = r[0:m:2], r[1:m:2]
+        z[0:m:2] = (a22 * r1 - a12 * r2) / det
+        z[1:m:2] = (a11 * r2 - a21 * r1) / det
+        z[m:] = tail * r[m:]
+        return z
+    return apply
+
+
+def incomplete_cholesky_preconditioner(a, drop_tol=1e-4, fill_factor=10):
+    # scipy has no incomplete Cholesky; threshold ILU of an SPD matrix in symmetric mode stands in for it
+    try:
+        ilu = spla.spilu(sp.csc_matrix(a), drop_tol=drop_tol, fill_factor=fill_factor,
+                         permc_spec="MMD_AT_PLUS_A", diag_pivot_thresh=0.0, options={"SymmetricMode": True})
+    except RuntimeError as err:
+        raise LinAlgError(str(err))
+    return ilu.solve
+
+
+preconditioners = {
+    None: lambda a: (lambda r: r),
+    "jacobi": jacobi_preconditioner,
+    "block_jacobi": block_jacobi_preconditioner,
+    "ichol": incomplete_cholesky_preconditioner,
+}
+
+
+class ConjugateGradientSolver(LinearSolver):
+    name = "cg"
+
+    def __init__(self, preconditioner="jacobi", tol=1e-8, maxiter=None, raise_on_failure=True):
+        super().__init__()
+        if preconditioner not in preconditioners:
+            raise ValueError("Unknown preconditioner: " + str(preconditioner))
+        self.preconditioner = preconditioner
+        self.tol = float(tol)
+        self.maxiter = int(maxiter) if maxiter is not None else None
+        self.raise_on_failure = raise_on_failure
+        self._a = None
+        self._m = None
+
+    def factorize(self, a):
+        self._a = sp.csr_matrix(a)
+        self._m = preconditioners[self.preconditioner](self._a)
+        self.stats = {"n": self._a.shape[0], "nnz": self._a.nnz, "preconditioner": self.preconditioner,
+                      "iterations": [], "residuals": [], "converged": []}
+        return self
+
+    def solve(self, b):
+        b = np.asarray(b, dtype=np.float64)
+        columns = b.reshape((b.shape[0], -1))
+        # the iteration stats describe the last solve, one entry per right hand side
+        self.stats.update(iterations=[], residuals=[], converged=[])
+        x = np.column_stack([self._solve_vector(columns[:, i]) for i in range(columns.shape[1])])
+        return x.reshape(b.shape)
+
+    def _solve_vector(self, b):
+        maxiter = self.maxiter if self.maxiter is not None else 10 * len(b)
+        norm_b = np.linalg.norm(b)
+        x = np.zeros_like(b)
+        history = [1.0]
+        if norm_b == 0:
+            self._record(0, history, True)
+            return x
+        r = b.copy()
+        z = self._m(r)
+        p = z.copy()
+        rz = r @ z
+        converged = False
+        iteration = 0
+        while iteration < maxiter:
+            ap = self._a @ p
+            pap = p @ ap
+            if pap <= 0:
+                raise LinAlgError("Matrix is not positive definite")
+            alpha = rz / pap
+            x += alpha * p
+            r -= alpha * ap
+            iteration += 1
+            history.append(np.linalg.norm(r) / norm_b)
+            if history[-1] <= self.tol:
+                converged = True
+                break
+            z = self._m(r)
+            rz_new = r @ z
+            p = z + (rz_new / rz) * p
+            rz = rz_new
+        self._record(iteration, history, converged)
+        if not converged and self.raise_on_failure:
+            raise LinAlgError(f"CG did not converge in {iteration} iterations, residual {history[-1]}")
+        return x
+
+    def _record(self, iterations, history, converged):
+        self.stats["iterations"].append(iterations)
+        self.stats["residuals"].append(history)
+        self.stats["converged"].append(converged)
+
+
+solvers = {s.name: s for s in (DenseSolver, SparseLUSolver, SparseDirectSolver, ConjugateGradientSolver)}
+
+
+def make_solver(solver="splu", **kwargs):
+    if isinstance(solver, LinearSolver):
+        return solver
+    if solver not in solvers:
+        raise ValueError("Unknown solver: " + str(solver))
+    return solvers[solver](**kwargs)
@@ -0,0 +1,44 @@
+from itertools import product
+
+import numpy as np
+
+
+def load_components(value, angle=55):
+    return value * np.cos(np.radians(angle)), value * np.cos(np.radians(angle + 90))
+
+
+class LoadCase:
+    def __init__(self, magnitude, angle=55, nodes=()):
+        self.magnitude = magnitude
+        self.angle = angle
+        self.nodes = list(nodes)
+
+    def components(self):
+        return load_components(self.magnitude, self.angle)
+
+    @staticmethod
+    def sweep(magnitudes, angles, nodes):
+        return [LoadCase(m, a, nodes) for m, a in product(magnitudes, angles)]
+
+    def __repr__(self):
+        return f"LoadCase({self.magnitude}, {self.angle}, {self.nodes})"
+
+
+class LoadCaseResults:
+    def __init__(self, cases, moving, dimension=2):
+        self.cases = cases
+        self.moving = moving  # (DOFs, cases)
+        self.dimension = dimension
+        self.max = moving.max(axis=1)
+        self.min = moving.min(axis=1)
+        self.max_case = moving.argmax(axis=1)
+        self.min_case = moving.argmin(axis=1)
+        self.magnitude = np.linalg.norm(moving.reshape((-1, dimension, len(cases))), axis=1)
+        self.max_magnitude = self.magnitude.max(axis=1)
+        self.max_magnitude_case = self.magnitude.argmax(axis=1)
+
+    def case(self, index):
+        return self.moving[:, index:index + 1]
+
+    def __len__(self):
+        return len(self.cases)
@@ -0,0 +1,77 @@
+import numpy as np
+
+from libs.Node import Node
+
+
+class Mesh:
+    def __init__(self, coords, triangles, raw_to_sorted=None, dimension=2):
+        self.dimension = dimension
+        self.coords = np.ascontiguousarray(coords, dtype=np.float64).reshape((-1, 2))
+        # (E, 3) corner nodes of linear triangles or (E, 6) corners and mid-side nodes of quadratic ones
+        self.triangles = np.ascontiguousarray(np.atleast_2d(triangles), dtype=np.int32)
+        if raw_to_sorted is None:
+            raw_to_sorted = np.arange(len(self.coords))
+        self.raw_to_sorted = np.asarray(raw_to_sorted, dtype=np.int32)
+        self.fixed = np.zeros(len(self.coords), dtype=bool)
+        self.loaded = np.zeros(len(self.coords), dtype=bool)
+        self.dofs = np.arange(self.n_dofs, dtype=np.int32).reshape((-1, dimension))
+
+    @property
+    def n_nodes(self):
+        return len(self.coords)
+
+    @property
+    def n_elements(self):
+        return len(self.triangles)
+
+    @property
+    def order(self):
+        return 1 if self.triangles.shape[1] == 3 else 2
+
+    @property
+    def n_dofs(self):
+        return self.dimension * len(self.coords)
+
+    @property
+    def raw_coords(self):
+        return self.coords[self.raw_to_sorted]
+
+    def set_raw_triangles(self, simplices):
+        self.triangles = np.ascontiguousarray(self.raw_to_sorted[np.asarray(simplices)], dtype=np.int32).reshape((-1, 3))
+
+    # mid-side nodes are appended after the corners, raw_to_sorted keeps addressing the corners
+    def quadratic(self):
+        t = self.triangles
+        edges = np.sort(np.stack([t[:, [0, 1]], t[:, [1, 2]], t[:, [2, 0]]], axis=1), axis=2).reshape((-1, 2))
+        unique, inverse = np.unique(edges, axis=0, return_inverse=True)
+        coords = np.concatenate([self.coords, self.coords[unique].mean(axis=1)])
+        mesh = Mesh(coords, np.column_stack([t, self.n_nodes + inverse.reshape((-1, 3))]), self.raw_to_sorted,
+                    self.dimension)
+        mesh.fixed[:self.n_nodes] = self.fixed
+        mesh.loaded[:self.n_nodes] = self.loaded
+        return mesh
+
+    # order[i] is the old number of the new node i
+    def permuted(self, order):
+        position = np.empty_like(order)
+        position[order] = np.arange(len(order))
+        mesh = Mesh(self.coords[order], position[self.triangles], position[self.raw_to_sorted], self.dimension)
+        mesh.fixed = self.fixed[order]
+        mesh.loaded = self.loaded[order]
+        return mesh
+
+    def element_dofs(self):
+        return self.dofs[self.triangles].reshape((len(self.triangles), -1))
+
+    # compatibility layer for the Node based API
+    def nodes(self):
+        nodes = [Node(x, y) for x, y in self.coords.tolist()]
+        for i, node in enumerate(nodes):
+            node.num = i
+            if self.fixed[i]:
+                node.set_fixed()
+        return nodes
+
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.coords, self.triangles, self.raw_to_sorted, self.fixed, self.loaded,
+                                      self.dofs))
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from threading import RLock
+
+import numpy as np
+
+# bump when the mesher changes, stored meshes of older versions are then never looked up
+version = 3
+
+
+def default_directory():
+    return os.environ.get("FEM_MESH_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "fem", "meshes"))
+
+
+def mesh_key(parts, size, **options):
+    digest = hashlib.sha1()
+    digest.update(str(version).encode())
+    for part in parts:
+        arr = np.ascontiguousarray(part, dtype=np.float64)
+        digest.update(str(arr.shape).encode())
+        digest.update(arr.tobytes())
+    digest.update(repr(float(size)).encode())
+    digest.update(repr(sorted(options.items())).encode())
+    return digest.hexdigest()
+
+
+# stands in for scipy's Delaunay on restored meshes, only points and simplices are used
+class Triangulation:
+    def __init__(self, points, simplices):
+        self.points = points
+        self.simplices = simplices
+
+
+class MeshEntry:
+    def __init__(self, key, coords, triangles, raw_to_sorted, simplices, numbering_report=None):
+        self.key = key
+        self.coords = coords
+        self.triangles = triangles
+        self.raw_to_sorted = raw_to_sorted
+        self.simplices = simplices
+        self.numbering_report = numbering_report
+
+    @staticmethod
+    def from_data(key, data):
+        mesh = data.mesh
+        return MeshEntry(key, mesh.coords.copy(), mesh.triangles.copy(), mesh.raw_to_sorted.copy(),
+                         np.array(data.tri.simplices, dtype=np.int32), data.numbering_report)
+
+    @property
+    def raw_coords(self):
+        return self.coords[self.raw_to_sorted]
+
+    def save(self, path):
+        # write to a temporary file first, so readers in other processes never see a partial entry
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(suffix=".npz", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, coords=self.coords, triangles=self.triangles, raw_to_sorted=self.raw_to_sorted,
+                         simplices=self.simplices, numbering_report=json.dumps(self.numbering_report))
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    @staticmethod
+    def load(key, path):
+        with np.load(path) as f:
+            return MeshEntry(key, f["coords"], f["triangles"], f["raw_to_sorted"], f["simplices"],
+                             json.loads(str(f["numbering_report"])))
+
+
+class MeshCache:
+    def __init__(self, maxsize=8, directory=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = RLock()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry
+            if self.directory is not None and os.path.exists(self.path(key)):
+                try:
+                    entry = MeshEntry.load(key, self.path(key))
+                except (OSError, ValueError, KeyError):
+                    entry = None
+                if entry is not None:
+                    self.disk_hits += 1
+                    self._remember(entry)
+                    return entry
+            self.misses += 1
+            return None
+
+    def put(self, entry):
+        with self._lock:
+            self._remember(entry)
+            if self.directory is not None:
+                entry.save(self.path(entry.key))
+            return entry
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+            if self.directory is None or not os.path.isdir(self.directory):
+                return
+            names = [key + ".npz"] if key is not None else \
+                [name for name in os.listdir(self.directory) if name.endswith(".npz")]
+            for name in names:
+                path = os.path.join(self.directory, name)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _remember(self, entry):
+        self._entries[entry.key] = entry
+        self._entries.move_to_end(entry.key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self._entries or (self.directory is not None and os.path.exists(self.path(key)))
+
+    def __len__(self):
+        return len(self._entries)
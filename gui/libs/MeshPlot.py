@@ -0,0 +1,75 @@
+import numpy as np
+from matplotlib.collections import LineCollection, PolyCollection
+
+from libs.StiffnessData import unique_edges
+
+
+# Owns one set of artists per axis and updates their data in place,
+# so repeated runs never add artists to the figure.
+class MeshPlot:
+    def __init__(self, figure):
+        self.figure = figure
+        self.mesh_axis = figure.add_subplot(121)
+        self.field_axis = figure.add_subplot(122)
+        self.outline, = self.mesh_axis.plot([], [], c="yellow")
+        self.edges = LineCollection([], colors="red", linewidths=0.5)
+        self.mesh_axis.add_collection(self.edges)
+        self.points, = self.mesh_axis.plot([], [], 'o', markersize=2)
+        self.field = PolyCollection([], edgecolors="k", linewidths=0.3)
+        self.field_axis.add_collection(self.field)
+        self.colorbar = None
+        self._mesh_key = None
+        self._field_key = None
+        self._xy = None
+        self._simplices = None
+        # bumped whenever the triangulation changes, the artists remember the version they show
+        self._version = 0
+
+    def draw_outline(self, outline):
+        xy = np.asarray(list(outline) + [outline[0]], dtype=np.float64)
+        self.outline.set_data(xy[:, 0], xy[:, 1])
+        self._rescale(self.mesh_axis, xy)
+
+    def draw_mesh(self, x, y, simplices):
+        xy, simplices = self._set_triangulation(x, y, simplices)
+        if self._mesh_key != self._version:
+            self.edges.set_segments(xy[unique_edges(simplices)])
+            self.points.set_data(xy[:, 0], xy[:, 1])
+            self._mesh_key = self._version
+            self._rescale(self.mesh_axis, xy)
+
+    # values are given either per triangle or per node (averaged over each triangle)
+    def draw_field(self, x, y, simplices, values):
+        xy, simplices = self._set_triangulation(x, y, simplices)
+        if self._field_key != self._version:
+            self.field.set_verts(xy[simplices])
+            self._field_key = self._version
+            self._rescale(self.field_axis, xy)
+        values = np.asarray(values, dtype=np.float64).reshape(-1)
+        if len(values) != len(simplices):
+            values = values[simplices].mean(axis=1)
+        self.field.set_array(values)
+        self.field.autoscale()
+        if self.colorbar is None:
+            self.colorbar = self.figure.colorbar(self.field, ax=self.field_axis)
+
+    def draw(self):
+        self.figure.canvas.draw_idle()
+
+    def _set_triangulation(self, x, y, simplices):
+        xy = np.column_stack([x, y]).astype(np.float64)
+        simplices = np.asarray(simplices)
+        if self._xy is None or self._xy.shape != xy.shape or not np.array_equal(self._xy, xy):
+            self._xy = xy
+            self._version += 1
+        if self._simplices is None or self._simplices.shape != simplices.shape \
+                or not np.array_equal(self._simplices, simplices):
+            self._simplices = simplices.copy()
+            self._version += 1
+        return self._xy, self._simplices
+
+    @staticmethod
+    def _rescale(axis, xy):
+        axis.ignore_existing_data_limits = True
+        axis.update_datalim(xy)
+        axis.autoscale_view()
@@ -0,0 +1,129 @@
+import csv
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+
+import numpy as np
+
+from libs.StiffnessData import StiffnessData
+from libs.Finite2DGenerator import Finite2DGenerator
+from libs.FactorizationCache import FactorizationCache
+from libs.MeshCache import MeshCache
+from libs.LoadCase import LoadCase
+from libs.ResultStore import ResultStore
+from libs.Substructure import Substructuring
+
+columns = ("size", "young", "poisson", "thickness", "magnitude", "nodes", "elements", "max_moving", "max_strain",
+           "max_stress", "run")
+
+# per worker process: meshes by geometry and size, factorizations by mesh, material and fixings;
+# with a mesh cache directory generated meshes are also stored on disk, so other workers and later studies
+# skip meshing
+_meshes = OrderedDict()
+_mesh_stores = {}
+_factorizations = FactorizationCache(8)
+
+
+def _mesh_store(directory):
+    if directory not in _mesh_stores:
+        _mesh_stores[directory] = MeshCache(4, directory)
+    return _mesh_stores[directory]
+
+
+def _mesh(parts, size, fixings, element="t3", mesh_cache=None, maxsize=4):
+    key = (repr(parts), size, repr(fixings), element)
+    data = _meshes.get(key)
+    if data is None:
+        data = StiffnessData()
+        data.mesh_cache = _mesh_store(mesh_cache)
+        data.element = element
+        data.define_nodes_mesh_by_parts(size, *parts)
+        for point in fixings:
+            data.set_fixing(point)
+        _meshes[key] = data
+        while len(_meshes) > maxsize:
+            _meshes.popitem(last=False)
+    _meshes.move_to_end(key)
+    return data
+
+
+def run_task(task):
+    (parts, fixings, load_nodes, angle, size, young, poisson, thickness, magnitudes, solver, store,
+     solver_options, element, substructuring, mesh_cache) = task
+    data = _mesh(parts, size, fixings, element, mesh_cache)
+    data.young, data.poisson, data.thickness, data.D = young, poisson, thickness / 1000.0, None
+    fg = Finite2DGenerator(data, solver, _factorizations, **solver_options)
+    cases = [LoadCase(m, angle, load_nodes) for m in magnitudes]
+    if substructuring:
+        results = Substructuring(fg, cache=_factorizations, solver=solver, **solver_options).calculate_load_cases(cases)
+    else:
+        results = fg.calculate_load_cases(cases)
+    rows = []
+    for i, case in enumerate(cases):
+        fg.calculate_stress(results.case(i))
+        row = {"size": size, "young": young, "poisson": poisson, "thickness": thickness,
+               "magnitude": case.magnitude, "nodes": data.mesh.n_nodes, "elements": data.mesh.n_elements,
+               "max_moving": float(np.abs(results.case(i)).max()),
+               "max_strain": float(np.abs(fg.strain).max()), "max_stress": float(fg.von_mises.max()), "run": ""}
+        if store is not None:
+            row["run"] = f"h{size:g}_E{young:g}_nu{poisson:g}_t{thickness:g}_P{case.magnitude:g}"
+            ResultStore(store).write_generator(row["run"], fg, dict(row), results.case(i))
+        rows.append(row)
+    return rows
+
+
+class ParameterStudy:
+    def __init__(self, parts, fixings, load_nodes, sizes, youngs, poissons, thicknesses, magnitudes, angle=55,
+                 solver="splu", store=None, solver_options=None, element="t3", substructuring=False,
+                 mesh_cache=None):
+        self.parts = parts
+        self.fixings = fixings
+        self.load_nodes = load_nodes
+        self.sizes = list(sizes)
+        self.youngs = list(youngs)
+        self.poissons = list(poissons)
+        self.thicknesses = list(thicknesses)
+        self.magnitudes = list(magnitudes)
+        self.angle = angle
+        self.solver = solver
+        self.store = store
+        self.solver_options = dict(solver_options or {})
+        self.element = element
+        self.substructuring = substructuring
+        self.mesh_cache = mesh_cache
+        self.table = []
+
+    @staticmethod
+    def from_job(job, sizes=None, youngs=None, poissons=None, thicknesses=None, magnitudes=None, store=None,
+                 mesh_cache=None):
+        return ParameterStudy(job.parts, job.fixings, job.load_nodes, sizes or [job.size], youngs or [job.young],
+                              poissons or [job.poisson], thicknesses or [job.thickness],
+                              magnitudes or [job.load_value], job.angle, job.solver, store, job.solver_options,
+                              job.element, job.substructuring, mesh_cache)
+
+    # one task per mesh and material, all load magnitudes are solved as columns of one right-hand side
+    def tasks(self):
+        return [(self.parts, self.fixings, self.load_nodes, self.angle, size, young, poisson, thickness,
+                 self.magnitudes, self.solver, self.store, self.solver_options, self.element, self.substructuring,
+                 self.mesh_cache)
+                for size, young, poisson, thickness in product(self.sizes, self.youngs, self.poissons,
+                                                               self.thicknesses)]
+
+    def __len__(self):
+        return len(self.sizes) * len(self.youngs) * len(self.poissons) * len(self.thicknesses) * len(self.magnitudes)
+
+    def run(self, workers=None):
+        self.table = []
+        # tasks sharing a mesh go out together so the worker caches can serve them
+        tasks = sorted(self.tasks(), key=lambda task: task[4])
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for future in as_completed([pool.submit(run_task, task) for task in tasks]):
+                rows = future.result()
+                self.table.extend(rows)
+                yield from rows
+
+    def write_csv(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(self.table)
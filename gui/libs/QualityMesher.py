@@ -0,0 +1,146 @@
+from time import perf_counter
+
+import numpy as np
+from scipy.spatial import Delaunay, cKDTree
+
+from libs.TriangleFilter import centroid_inside, min_area, points_inside, triangle_mask
+from libs.TriangleGeometry import double_areas, edge_lengths, min_angles
+
+# Conforming Delaunay refinement in the manner of Ruppert's algorithm. The outlines of the parts are the
+# constraint segments; they are split until no vertex lies in the diametral circle of a piece, which makes
+# every piece an edge of the Delaunay triangulation, so triangles never cross an outline. Triangles with a
+# small angle or a large circumradius then get their circumcenter inserted, unless it would encroach
+# a segment, in which case the segment is split instead.
+
+
+def outline_segments(parts, tolerance=1e-6):
+    # every edge of every part, cut at the vertices lying on it, so overlapping edges of parts collapse
+    vertices = np.unique(np.concatenate([np.asarray(p, dtype=np.float64) for p in parts]), axis=0)
+    segments = set()
+    for part in parts:
+        p = np.asarray(part, dtype=np.float64)
+        for a, b in zip(p, np.roll(p, -1, axis=0)):
+            t, distance = _project(vertices, a, b)
+            on = np.flatnonzero((distance < tolerance) & (t > -tolerance) & (t < 1 + tolerance))
+            on = on[np.argsort(t[on])]
+            segments.update((min(u, v), max(u, v)) for u, v in zip(on[:-1].tolist(), on[1:].tolist()))
+    return vertices, np.array(sorted(segments), dtype=np.int64).reshape((-1, 2))
+
+
+def _project(points, a, b):
+    ab = b - a
+    t = (points - a) @ ab / (ab @ ab)
+    distance = np.linalg.norm(points - (a + np.clip(t, 0, 1)[:, None] * ab), axis=1)
+    return t, distance
+
+
+def split_segments(vertices, segments, size):
+    a, b = vertices[segments[:, 0]], vertices[segments[:, 1]]
+    pieces = np.maximum(np.ceil(np.linalg.norm(b - a, axis=1) / size).astype(np.int64), 1)
+    segment = np.repeat(np.arange(len(segments)), pieces - 1)
+    t = (np.arange(len(segment)) - np.repeat(np.cumsum(pieces - 1) - (pieces - 1), pieces - 1) + 1) / pieces[segment]
+    return a[segment] + t[:, None] * (b[segment] - a[segment])
+
+
+def lattice(parts, vertices, segments, size):
+    # equilateral grid, kept clear of the segments so it does not encroach their pieces
+    low, high = vertices.min(axis=0), vertices.max(axis=0)
+    ys = np.arange(low[1], high[1] + size, size * np.sqrt(3) / 2)
+    xs = np.arange(low[0], high[0] + size, size)
+    x = xs[None, :] + (np.arange(len(ys)) % 2)[:, None] * size / 2
+    grid = np.column_stack([x.ravel(), np.repeat(ys, len(xs))])
+    inside = np.zeros(len(grid), dtype=bool)
+    for part in parts:
+        inside |= points_inside(part, grid)
+    grid = grid[inside]
+    clear = np.ones(len(grid), dtype=bool)
+    for i, j in segments.tolist():
+        clear &= _project(grid, vertices[i], vertices[j])[1] > size / 2
+    return grid[clear]
+
+
+def unique_points(points, decimals=6):
+    _, first = np.unique(np.round(points, decimals), axis=0, return_index=True)
+    return points[np.sort(first)]
+
+
+def subsegments(points, vertices, segments, tolerance=1e-6):
+    pieces = []
+    for i, j in segments.tolist():
+        t, distance = _project(points, vertices[i], vertices[j])
+        on = np.flatnonzero((distance < tolerance) & (t > -tolerance) & (t < 1 + tolerance))
+        on = on[np.argsort(t[on])]
+        pieces.append(np.column_stack([on[:-1], on[1:]]))
+    return np.concatenate(pieces) if pieces else np.empty((0, 2), dtype=np.int64)
+
+
+def triangle_quality(simplices, xy):
+    p = xy[simplices]
+    edges = edge_lengths(p)
+    with np.errstate(divide="ignore"):
+        radius = edges.prod(axis=1) / (2 * double_areas(p))
+    return min_angles(p), radius, edges.min(axis=1)
+
+
+def circumcenters(simplices, xy):
+    p = xy[simplices]
+    b, c = p[:, 1] - p[:, 0], p[:, 2] - p[:, 0]
+    d = 2 * (b[:, 0] * c[:, 1] - b[:, 1] * c[:, 0])
+    bb, cc = (b * b).sum(axis=1), (c * c).sum(axis=1)
+    ux = (c[:, 1] * bb - b[:, 1] * cc) / d
+    uy = (b[:, 0] * cc - c[:, 0] * bb) / d
+    return p[:, 0] + np.column_stack([ux, uy])
+
+
+def quality_mesh(parts, size, min_angle=20, points=None, min_edge=0.05, max_passes=60):
+    vertices, segments = outline_segments(parts)
+    if points is None:
+        points = np.concatenate([vertices, split_segments(vertices, segments, size),
+                                 lattice(parts, vertices, segments, size)])
+    else:
+        points = np.concatenate([vertices, np.asarray(points, dtype=np.float64).reshape((-1, 2))])
+    inside = centroid_inside(*parts)
+    passes = []
+    for n_pass in range(max_passes):
+        start = perf_counter()
+        points = unique_points(points)
+        pieces = subsegments(points, vertices, segments)
+        middle = (points[pieces[:, 0]] + points[pieces[:, 1]]) / 2
+        half = np.linalg.norm(points[pieces[:, 1]] - points[pieces[:, 0]], axis=1) / 2
+        # the pieces' own ends lie on their diametral circles, a third point there encroaches;
+        # pieces below the smallest edge are left alone, as are triangles, so small input angles terminate
+        splittable = half > min_edge * size / 2
+        distance, _ = cKDTree(points).query(middle, k=3)
+        split = (distance[:, 2] <= half * (1 + 1e-9)) & splittable
+        added = []
+        if not split.any():
+            simplices = Delaunay(points).simplices
+            simplices = simplices[triangle_mask(simplices, points, inside, min_area())]
+            angle, radius, shortest = triangle_quality(simplices, points)
+            bad = ((angle < min_angle) | (radius > 0.7 * size)) & (shortest > min_edge * size)
+            order = np.flatnonzero(bad)[np.argsort(angle[bad])]
+            candidates, radius = circumcenters(simplices[order], points), radius[order]
+            if len(candidates):
+                # circumcenters encroaching a piece are replaced by the split of that piece
+                tree = cKDTree(candidates)
+                distance, _ = tree.query(middle, k=1)
+                split = (distance < half * (1 + 1e-9)) & splittable
+                keep = np.any([points_inside(part, candidates) for part in parts], axis=0)
+                for i in np.flatnonzero(distance < half * (1 + 1e-9)).tolist():
+                    keep[tree.query_ball_point(middle[i], half[i] * (1 + 1e-9))] = False
+                # of circumcenters crowding each other only the one of the worst triangle goes in
+                pairs = tree.query_pairs(size / 2, output_type="ndarray")
+                if len(pairs):
+                    close = np.linalg.norm(candidates[pairs[:, 0]] - candidates[pairs[:, 1]], axis=1) < \
+                        np.minimum(radius[pairs[:, 0]], radius[pairs[:, 1]]) / 2
+                    keep[pairs[close].max(axis=1)] = False
+                added.append(candidates[keep])
+        if split.any():
+            added.append(middle[split])
+        n_added = sum(len(a) for a in added)
+        passes.append({"pass": n_pass, "points": len(points), "split": int(split.sum()), "added": n_added,
+                       "time": perf_counter() - start})
+        if n_added == 0:
+            break
+        points = np.concatenate([points] + added)
+    return points, passes
@@ -0,0 +1,121 @@
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from libs.Digest import array_digest
+from libs.Vtu import write_vtu
+
+# one .npy per array, so single fields of single runs are memory-mapped without reading the rest:
+#   meshes/<sha1 of coords and triangles>/{coords,triangles}.npy  shared by the runs on that mesh
+#   runs/<name>/<field>.npy, runs/<name>/metadata.json
+point_fields = ("moving", "nodal_stress", "nodal_von_mises")
+cell_fields = ("strain", "stress", "von_mises")
+
+
+def mesh_digest(coords, triangles):
+    return array_digest(coords, triangles).hexdigest()
+
+
+def generator_fields(fg, moving=None):
+    moving = fg.calculated_moving if moving is None else moving
+    return {"moving": np.asarray(moving, dtype=np.float64).reshape((-1, fg.dimension)), "strain": fg.strain,
+            "stress": fg.stress, "von_mises": fg.von_mises, "nodal_stress": fg.nodal_stress,
+            "nodal_von_mises": fg.nodal_von_mises}
+
+
+class StoredResult:
+    def __init__(self, store, name, info, mmap=True):
+        self.store = store
+        self.name = name
+        self.info = info
+        self.metadata = info["metadata"]
+        self.fields = list(info["fields"])
+        self.mmap_mode = "r" if mmap else None
+
+    def __getitem__(self, field):
+        if field not in self.info["fields"]:
+            raise KeyError(field)
+        return np.load(os.path.join(self.store.run_path(self.name), field + ".npy"), mmap_mode=self.mmap_mode)
+
+    @property
+    def coords(self):
+        return np.load(os.path.join(self.store.mesh_path(self.info["mesh"]), "coords.npy"), mmap_mode=self.mmap_mode)
+
+    @property
+    def triangles(self):
+        return np.load(os.path.join(self.store.mesh_path(self.info["mesh"]), "triangles.npy"),
+                       mmap_mode=self.mmap_mode)
+
+    def to_vtu(self, path):
+        write_vtu(path, self.coords, self.triangles,
+                  {f: self[f] for f in self.fields if f in point_fields},
+                  {f: self[f] for f in self.fields if f in cell_fields})
+
+
+class ResultStore:
+    def __init__(self, directory):
+        self.directory = directory
+
+    def mesh_path(self, key):
+        return os.path.join(self.directory, "meshes", key)
+
+    def run_path(self, name):
+        if not name or os.sep in name or name in (".", ".."):
+            raise ValueError("Invalid run name: " + repr(name))
+        return os.path.join(self.directory, "runs", name)
+
+    def write(self, name, coords, triangles, fields, metadata=None):
+        coords = np.ascontiguousarray(coords, dtype=np.float64)
+        triangles = np.ascontiguousarray(triangles, dtype=np.int32)
+        key = mesh_digest(coords, triangles)
+        if not os.path.isdir(self.mesh_path(key)):
+            self._publish(self.mesh_path(key), {"coords": coords, "triangles": triangles}, replace=False)
+        fields = {k: np.ascontiguousarray(v) for k, v in fields.items() if v is not None}
+        info = {"mesh": key, "metadata": metadata or {},
+                "fields": {k: {"shape": list(v.shape), "dtype": str(v.dtype)} for k, v in fields.items()}}
+        self._publish(self.run_path(name), fields, info)
+        return StoredResult(self, name, info)
+
+    def write_generator(self, name, fg, metadata=None, moving=None):
+        return self.write(name, fg.coords, fg.triangles, generator_fields(fg, moving), metadata)
+
+    def read(self, name, mmap=True):
+        with open(os.path.join(self.run_path(name), "metadata.json")) as f:
+            return StoredResult(self, name, json.load(f), mmap)
+
+    def runs(self):
+        directory = os.path.join(self.directory, "runs")
+        return sorted(name for name in os.listdir(directory) if not name.startswith(".")) \
+            if os.path.isdir(directory) else []
+
+    def remove(self, name):
+        shutil.rmtree(self.run_path(name))
+
+    def __contains__(self, name):
+        return os.path.exists(os.path.join(self.run_path(name), "metadata.json"))
+
+    def __len__(self):
+        return len(self.runs())
+
+    # arrays go to a temporary directory that is renamed into place, readers never see a partial run;
+    # a mesh already published by another process is kept
+    def _publish(self, path, arrays, info=None, replace=True):
+        parent = os.path.dirname(path)
+        os.makedirs(parent, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix=".", dir=parent)
+        try:
+            for k, v in arrays.items():
+                np.save(os.path.join(tmp, k + ".npy"), v)
+            if info is not None:
+                with open(os.path.join(tmp, "metadata.json"), "w") as f:
+                    json.dump(info, f, indent=2)
+            if replace and os.path.isdir(path):
+                shutil.rmtree(path)
+            os.replace(tmp, path)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            if replace or not os.path.isdir(path):
+                raise
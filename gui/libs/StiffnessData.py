@@ -1,36 +1,114 @@
-from scipy.spatial import Delaunay
-from math import sqrt, ceil
+from scipy.spatial import Delaunay, cKDTree
+from scipy.sparse.csgraph import reverse_cuthill_mckee, connected_components
+import scipy.sparse as sp
+from time import perf_counter
 from libs.Node import Node
-from libs.TriangleStiffness import clockwise_angle_and_distance, set_clockwise_origin
+from libs.Mesh import Mesh
+from libs.Instrumentation import Report
+from libs.MeshCache import MeshEntry, Triangulation, mesh_key
+from libs.QualityMesher import quality_mesh
+from libs.TriangleFilter import triangle_mask, edge_rule, centroid_inside, min_area, points_inside
+from libs.LoadCase import load_components
 
 import numpy as np
 
 
-def split_via_delaunay(points, max_length):
-    tri = Delaunay(points)
-    # get set of edges from the simpleces
-    edges = set()
-    for simplex in tri.simplices:
-        # simplex is one triangle: [ 4  5 17]
-        edges.add((simplex[0], simplex[1]))
-        edges.add((simplex[1], simplex[2]))
-        edges.add((simplex[0], simplex[2]))
-    # check if all edges are small enough
-    # and add new points if not
-    is_finished = True
-    for edge in edges:
-        p1, p2 = edge
-        [x1, y1] = points[p1]
-        [x2, y2] = points[p2]
-        length = sqrt((x2 - x1) * (x2 - x1) + (y2 - y1) * (y2 - y1))
-        if length > max_length:
-            is_finished = False
-            # split in how many pieces?
-            n_pieces = ceil(length / max_length)
-            for piece in range(1, int(n_pieces)):
-                points.append([x1 + piece / float(n_pieces) * (x2 - x1), y1 + piece / float(n_pieces) * (y2 - y1)])
-    if not is_finished:
-        split_via_delaunay(points, max_length)
+def unique_edges(simplices):
+    s = np.asarray(simplices)
+    edges = np.sort(np.concatenate([s[:, [0, 1]], s[:, [1, 2]], s[:, [0, 2]]]), axis=1)
+    return np.unique(edges, axis=0)
+
+
+def split_via_delaunay(points, max_length, max_passes=100, decimals=6):
+    passes = []
+    for n_pass in range(max_passes):
+        start = perf_counter()
+        xy = np.asarray(points, dtype=np.float64)
+        edges = unique_edges(Delaunay(xy).simplices)
+        p1, p2 = xy[edges[:, 0]], xy[edges[:, 1]]
+        length = np.hypot(p2[:, 0] - p1[:, 0], p2[:, 1] - p1[:, 1])
+        long = length > max_length
+        added = 0
+        if long.any():
+            # split every long edge into ceil(length / max_length) pieces at once
+            n_pieces = np.ceil(length[long] / max_length).astype(np.int64)
+            counts = n_pieces - 1
+            edge = np.repeat(np.arange(len(counts)), counts)
+            piece = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+            t = (piece / n_pieces[edge])[:, None]
+            new = p1[long][edge] + t * (p2[long][edge] - p1[long][edge])
+            # drop split points that coincide with each other or with existing points
+            keys = np.round(np.concatenate([xy, new]), decimals)
+            _, first = np.unique(keys, axis=0, return_index=True)
+            first = np.sort(first[first >= len(xy)]) - len(xy)
+            points.extend(new[first].tolist())
+            added = len(first)
+        passes.append({"pass": n_pass, "points": len(xy), "edges": len(edges), "added": added,
+                       "time": perf_counter() - start})
+        if added == 0:
+            break
+    return passes
+
+
+# remap[i] is the smallest index of the points lying within tolerance of point i
+def merge_duplicates(points, tolerance=1e-6):
+    xy = np.asarray(points, dtype=np.float64).reshape((-1, 2))
+    pairs = cKDTree(xy).query_pairs(tolerance, output_type="ndarray")
+    graph = sp.coo_matrix((np.ones(len(pairs), dtype=np.int8), (pairs[:, 0], pairs[:, 1])), shape=(len(xy), len(xy)))
+    _, labels = connected_components(graph, directed=False)
+    first = np.full(labels.max() + 1 if len(labels) else 0, len(xy), dtype=np.int64)
+    np.minimum.at(first, labels, np.arange(len(xy)))
+    return first[labels]
+
+
+def node_graph(triangles, n):
+    t = np.asarray(triangles, dtype=np.int64).reshape((-1, 3))
+    rows = np.concatenate([t[:, 0], t[:, 1], t[:, 2], t[:, 1], t[:, 2], t[:, 0], np.arange(n)])
+    cols = np.concatenate([t[:, 1], t[:, 2], t[:, 0], t[:, 0], t[:, 1], t[:, 2], np.arange(n)])
+    return sp.csr_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(n, n))
+
+
+# bandwidth and profile of the stiffness matrix (2 DOFs per node) for the given numbering
+def bandwidth_and_profile(triangles, n):
+    graph = node_graph(triangles, n).tocoo()
+    lowest = np.arange(n)
+    np.minimum.at(lowest, graph.row, graph.col)
+    bandwidth = int(np.abs(graph.row - graph.col).max()) if graph.nnz else 0
+    return 2 * bandwidth + 1, int(np.sum(4 * (np.arange(n) - lowest) + 1))
+
+
+# reverse Cuthill-McKee for the given triangles, kept only when it lowers the profile of their numbering;
+# returns the new order, None to keep the numbering, and the figures of both
+def rcm_order(triangles, n):
+    rcm = reverse_cuthill_mckee(node_graph(triangles, n), symmetric_mode=True)
+    position = np.empty_like(rcm)
+    position[rcm] = np.arange(n)
+    before = bandwidth_and_profile(triangles, n)
+    after = bandwidth_and_profile(position[triangles], n)
+    kept = after[1] < before[1]
+    if not kept:
+        after = before
+    report = {"bandwidth_before": before[0], "profile_before": before[1],
+              "bandwidth_after": after[0], "profile_after": after[1], "rcm": bool(kept)}
+    return (rcm if kept else None), report
+
+
+def clockwise_order(coords, origin, refvec=(0, 1)):
+    # the former clockwise node sort around origin, computed on a coordinate array
+    vector = np.asarray(coords, dtype=np.float64) - origin
+    length = np.hypot(vector[:, 0], vector[:, 1])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        normalized = vector / length[:, None]
+    angle = np.arctan2(refvec[1] * normalized[:, 0] - refvec[0] * normalized[:, 1],
+                       normalized[:, 0] * refvec[0] + normalized[:, 1] * refvec[1])
+    angle = np.where(angle < 0, 2 * np.pi + angle, angle)
+    angle[length == 0] = -np.pi
+    order = np.lexsort((length, angle))
+    return np.concatenate([order[:1], order[1:][::-1]])
+
+
+# linear triangles and quadratic 6-node ones
+elements = ("t3", "t6")
 
 
 class StiffnessData:
@@ -38,16 +116,32 @@ class StiffnessData:
         self.loads = None
         self.moving = None
         self.points = None
-        self.nodes = None
+        self.mesh = None
+        self._nodes = None
         self.poisson = None
         self.thickness = None
         self.young = None
         self.tri = None
-        self.__nodes = None
         self.D = None
+        self.renumber = "rcm"
+        self.merge_tolerance = 1e-6
+        self.node_lookup = None
+        self.node_tree = None
+        self.numbering_report = None
+        self.split_passes = None
+        self.report = Report()
+        self.mesh_cache = None
+        self.parts = None
+        self.size = None
+        # "quality" meshes the outlines as constraints with a minimum angle, "split" is the former
+        # splitting of the outlines with a triangulation of their convex hull
+        self.mesher = "quality"
+        self.min_angle = 20
+        self.mesh_passes = None
+        self.element = "t3"  # "t6" adds mid-side nodes to every triangle once it is meshed
 
     def is_prepared(self):
-        return self.nodes is not None and self.thickness is not None    \
+        return self.mesh is not None and self.thickness is not None    \
                and self.young is not None and self.poisson is not None
 
     def d(self):
@@ -63,96 +157,236 @@ class StiffnessData:
 
     def define_nodes_mesh(self, _points, size=None, split=True):
         if split:
-            split_via_delaunay(_points, size)
-        self.tri = Delaunay(_points)
+            with self.report.stage("split", points=len(_points)) as stage:
+                self.split_passes = split_via_delaunay(_points, size)
+                stage.info["points"] = len(_points)
+        with self.report.stage("triangulate") as stage:
+            remap = merge_duplicates(_points, self.merge_tolerance)
+            _points = [p for i, p in enumerate(_points) if remap[i] == i]
+            self.tri = Delaunay(_points)
+            stage.info.update(points=len(_points), elements=len(self.tri.simplices))
         self.create_nodes(_points)
         self.points = _points
-        self.loads = np.zeros((2 * len(self.nodes), 1))
-        self.moving = np.ones((2 * len(self.nodes), 1))
+        self.loads = np.zeros((self.mesh.n_dofs, 1))
+        self.moving = np.ones((self.mesh.n_dofs, 1))
 
     def define_nodes_mesh_by_parts(self, size, *args):
+        self.parts, self.size = args, size
+        key = None
+        if self.mesh_cache is not None:
+            key = mesh_key(args, size, renumber=self.renumber, merge_tolerance=self.merge_tolerance,
+                           mesher=self.mesher, min_angle=self.min_angle)
+            entry = self.mesh_cache.get(key)
+            if entry is not None:
+                self.restore_mesh(entry)
+                self.set_element()
+                return
+        if self.mesher == "quality":
+            self.define_quality_mesh()
+        else:
+            self.define_split_mesh(size, *args)
+        if self.mesh_cache is not None:
+            self.mesh_cache.put(MeshEntry.from_data(key, self))
+        self.set_element()
+
+    def set_element(self):
+        if self.element not in elements:
+            raise ValueError(f"Unknown element {self.element!r}, expected one of {', '.join(elements)}")
+        if self.element != "t6" or self.mesh.order == 2:
+            return
+        with self.report.stage("quadratic", elements=self.mesh.n_elements) as stage:
+            mesh = self.mesh.quadratic()
+            # the report of the linear mesh does not hold for the added mid-side nodes
+            self.numbering_report = None
+            if self.renumber == "rcm":
+                # the corner and mid-side nodes split every element into four linear triangles for the graph
+                t = mesh.triangles
+                corners = np.concatenate([t[:, [0, 3, 5]], t[:, [3, 1, 4]], t[:, [5, 4, 2]], t[:, [3, 4, 5]]])
+                rcm, self.numbering_report = rcm_order(corners, mesh.n_nodes)
+                if rcm is not None:
+                    mesh = mesh.permuted(rcm)
+                stage.info.update(self.numbering_report)
+            self.mesh = mesh
+            self._nodes = None
+            self._build_node_index()
+            stage.info.update(nodes=self.mesh.n_nodes, dofs=self.mesh.n_dofs)
+        self.loads = np.zeros((self.mesh.n_dofs, 1))
+        self.moving = np.ones((self.mesh.n_dofs, 1))
+
+    def define_quality_mesh(self, points=None):
+        with self.report.stage("quality_mesh", parts=len(self.parts)) as stage:
+            result, self.mesh_passes = quality_mesh(self.parts, self.size, self.min_angle, points)
+            stage.info.update(points=len(result), passes=len(self.mesh_passes))
+        self.define_nodes_mesh(result.tolist(), None, False)
+        self.filter_parts()
+
+    def define_split_mesh(self, size, *args):
         result = []
-        for arr in args:
-            temp = arr.copy()
-            split_via_delaunay(temp, size)
-            result += temp
+        self.split_passes = []
+        with self.report.stage("split") as stage:
+            for arr in args:
+                temp = arr.copy()
+                self.split_passes.append(split_via_delaunay(temp, size))
+                # splitting the convex hull edges of a concave part leaves points outside of it
+                inside = points_inside(arr, temp, self.merge_tolerance)
+                result += [p for p, keep in zip(temp, inside.tolist()) if keep]
+            stage.info.update(parts=len(args), points=len(result))
         self.define_nodes_mesh(result, None, False)
-        self.clear_mesh(Node(400, 100))
+        self.filter_parts()
+
+    def restore_mesh(self, entry):
+        with self.report.stage("restore_mesh", nodes=len(entry.coords), elements=len(entry.triangles)):
+            self.tri = Triangulation(entry.raw_coords, entry.simplices.copy())
+            self.mesh = Mesh(entry.coords.copy(), entry.triangles, entry.raw_to_sorted)
+            self.points = self.tri.points.tolist()
+            self.numbering_report = entry.numbering_report
+            self.split_passes = None
+            self._nodes = None
+            self._build_node_index()
+        self.loads = np.zeros((self.mesh.n_dofs, 1))
+        self.moving = np.ones((self.mesh.n_dofs, 1))
+
+    # meshing replaces the mesh objects instead of changing them, so a shallow copy of the attributes
+    # is enough to go back to an earlier mesh
+    def mesh_state(self):
+        return dict(vars(self))
+
+    def restore_state(self, state):
+        vars(self).update(state)
+
+    # bisect every edge of the given elements and triangulate again, so the neighbours stay conforming;
+    # fixings and loads have to be set again afterwards
+    def refine(self, elements):
+        with self.report.stage("refine", elements=len(elements)) as stage:
+            xy = self.mesh.raw_coords
+            edges = unique_edges(np.asarray(self.tri.simplices)[elements])
+            points = np.concatenate([xy, (xy[edges[:, 0]] + xy[edges[:, 1]]) / 2])
+            stage.info["added"] = len(edges)
+        if self.mesher == "quality" and self.parts is not None:
+            self.define_quality_mesh(points)
+        else:
+            self.define_nodes_mesh(points.tolist(), None, False)
+            self.filter_parts()
+        self.set_element()
+
+    def filter_parts(self):
+        if self.parts is None:
+            self.filter_mesh(min_area())
+            return
+        # the quality mesher keeps the outlines as edges, outside triangles are told apart by their centroid
+        if self.mesher != "quality":
+            self.clear_mesh(Node(400, 100))
+        self.filter_mesh(centroid_inside(*self.parts), min_area())
 
     def clear_mesh(self, edge):
-        temp = self.tri.simplices.tolist()
-        on_edge = []
-        for s in temp:
-            if any([True for i in s if self.__nodes[i].y == edge.y and self.__nodes[i].x > edge.x]):
-                on_edge.append(s)
-        to_del = []
-        for n in on_edge:
-            pp = None
-            for i in n:
-                if self.__nodes[i].y == edge.y and self.__nodes[i].x > edge.x:
-                    pp = self.__nodes[i]
-            if pp is not None:
-                if any(True for i in n if self.__nodes[i].y < pp.y):
-                    to_del.append(n)
-        for d in to_del:
-            temp.remove(d)
-        self.tri.simplices = np.array(temp)
+        self.filter_mesh(edge_rule(edge))
+
+    def filter_mesh(self, *predicates):
+        with self.report.stage("filter", predicates=len(predicates)) as stage:
+            keep = triangle_mask(self.tri.simplices, self.mesh.raw_coords, *predicates)
+            self.tri.simplices = np.ascontiguousarray(self.tri.simplices[keep])
+            self.mesh.set_raw_triangles(self.tri.simplices)
+            # the numbering is made for the triangles that are left
+            self._renumber()
+            stage.info["elements"] = self.mesh.n_elements
+        return keep
 
     def set_fixing(self, point):
-        index = self.nodes.index(point)
+        index = self.node_index(point)
         self.moving[2 * index], self.moving[2 * index + 1] = 0, 0
+        self.mesh.fixed[index] = True
         self.set_undefined_load(point)
 
     # set loads by Ox and Oy
-    def set_load(self, point, value):
-        index = self.nodes.index(point)
-        self.loads[2 * index][0], self.loads[2 * index + 1][0] = value * np.cos(np.radians(55)), value * np.cos(np.radians(145))
+    def set_load(self, point, value, angle=55):
+        index = self.node_index(point)
+        self.loads[2 * index][0], self.loads[2 * index + 1][0] = load_components(value, angle)
+        self.mesh.loaded[index] = not np.isnan(value) and value != 0
+
+    def get_load_matrix(self, cases):
+        loads = np.zeros((self.mesh.n_dofs, len(cases)))
+        for j, case in enumerate(cases):
+            px, py = case.components()
+            for point in case.nodes:
+                index = self.node_index(point)
+                if self.moving[2 * index][0] == 0:
+                    raise ValueError("Load applied to fixed node " + str(point))
+                loads[2 * index][j] += px
+                loads[2 * index + 1][j] += py
+        return loads
 
     def set_undefined_load(self, point):
         self.set_load(point, np.nan)
 
+    @property
+    def nodes(self):
+        if self._nodes is None and self.mesh is not None:
+            self._nodes = self.mesh.nodes()
+        return self._nodes
+
+    @property
+    def raw_to_sorted(self):
+        return self.mesh.raw_to_sorted if self.mesh is not None else None
+
     def get_tri_x(self):
-        return [n.x for n in self.__nodes] if self.tri is not None else None
+        return self.mesh.raw_coords[:, 0] if self.tri is not None else None
 
     def get_tri_y(self):
-        return [n.y for n in self.__nodes] if self.tri is not None else None
+        return self.mesh.raw_coords[:, 1] if self.tri is not None else None
 
     def create_nodes(self, points):
-        self.__nodes = [Node(p) for p in points]
-        duplicated_points = self._find_duplicated_elements(self.__nodes)
-        for k in duplicated_points:  # change duplicated to one object
-            for i in duplicated_points[k]:
-                self.__nodes[i] = self.__nodes[k]
-        # self.nodes = sorted(list(set(self.__nodes)), key=lambda point: [point.y, point.x])
-        set_clockwise_origin([0, 0])  # TODO: fake
-        self.nodes = StiffnessData.mesh_sort(self.__nodes)
-        for i in range(len(self.nodes)):
-            self.nodes[i].num = i
+        with self.report.stage("create_nodes") as stage:
+            xy = np.asarray(points, dtype=np.float64).reshape((-1, 2))
+            remap = merge_duplicates(xy, self.merge_tolerance)
+            unique, raw_to_unique = np.unique(remap, return_inverse=True)
+            coords = xy[unique]
+            self.mesh = Mesh(coords, np.empty((0, 3)), raw_to_unique)
+            if self.tri is not None:
+                self.mesh.set_raw_triangles(self.tri.simplices)
+            self._renumber()
+            stage.info.update(nodes=self.mesh.n_nodes, dofs=self.mesh.n_dofs)
+            if self.numbering_report is not None:
+                stage.info.update(self.numbering_report)
+
+    def _node_key(self, x, y):
+        return int(np.round(x / self.merge_tolerance)), int(np.round(y / self.merge_tolerance))
+
+    def _build_node_index(self):
+        keys = np.round(self.mesh.coords / self.merge_tolerance).astype(np.int64).tolist()
+        self.node_lookup = dict(zip(map(tuple, keys), range(len(keys))))
+        self.node_tree = cKDTree(self.mesh.coords)
+
+    def node_index(self, point):
+        x, y = (point.x, point.y) if hasattr(point, "x") else point
+        index = self.node_lookup.get(self._node_key(x, y))
+        if index is None:
+            distance, index = self.node_tree.query([x, y], distance_upper_bound=self.merge_tolerance)
+            if np.isinf(distance):
+                raise ValueError(f"{point} is not a mesh node")
+        return int(index)
+
+    def nearest_node(self, point):
+        x, y = (point.x, point.y) if hasattr(point, "x") else point
+        return int(self.node_tree.query([x, y])[1])
+
+    # clockwise numbering, then reverse Cuthill-McKee on the current triangles where it lowers the profile
+    def _renumber(self):
+        order = clockwise_order(self.mesh.coords, [0, 0])  # TODO: fake
+        self._permute(order)
+        self.numbering_report = None
+        if self.renumber == "rcm" and self.tri is not None:
+            rcm, self.numbering_report = rcm_order(self.mesh.triangles, self.mesh.n_nodes)
+            if rcm is not None:
+                self._permute(rcm)
+        self._nodes = None
+        self._build_node_index()
+
+    def _permute(self, order):
+        self.mesh = self.mesh.permuted(order)
+        dofs = (self.mesh.dimension * np.asarray(order)[:, None] + np.arange(self.mesh.dimension)).ravel()
+        if self.loads is not None and len(self.loads) == len(dofs):
+            self.loads, self.moving = self.loads[dofs], self.moving[dofs]
 
     def get_raw_nodes(self):
-        return self.__nodes
-
-    @staticmethod
-    def _find_duplicated_elements(array):
-        excluded = []  # for indexes which already appended to dictionary
-        indexes = {}
-        for i in range(len(array) - 1):
-            if i in excluded:
-                continue
-            for j in range(i + 1, len(array)):
-                if array[i] == array[j]:
-                    if i in indexes:
-                        indexes[i].append(j)
-                    else:
-                        indexes[i] = [j]
-                    excluded.append(j)
-        return indexes
-
-    @staticmethod
-    def mesh_sort(nds):
-        nodes = sorted(list(set(nds)), key=clockwise_angle_and_distance)
-        nn = nodes[0]
-        nodes.remove(nn)
-        nodes.append(nn)
-        nodes.reverse()
-        return nodes
+        nodes = self.nodes
+        return [nodes[i] for i in self.mesh.raw_to_sorted.tolist()]
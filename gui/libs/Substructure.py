@@ -0,0 +1,151 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from libs.Digest import array_digest
+from libs.LinearSolver import make_solver
+from libs.LoadCase import LoadCaseResults
+from libs.TriangleFilter import points_inside
+
+
+def part_labels(triangles, coords, parts):
+    # an element belongs to the last part containing its centroid, parts drawn later lie on top
+    centroids = np.asarray(coords)[np.asarray(triangles)[:, :3]].mean(axis=1)
+    labels = np.zeros(len(centroids), dtype=np.int64)
+    for i, part in enumerate(parts):
+        labels[points_inside(part, centroids)] = i
+    return labels
+
+
+def condensation_key(values, dofs, interior, boundary, solver, **solver_options):
+    solver = make_solver(solver, **solver_options)
+    digest = array_digest(values, dofs, interior, boundary)
+    digest.update(solver.name.encode())
+    digest.update(repr(sorted(solver.options().items())).encode())
+    return digest.hexdigest()
+
+
+# one part with its interior DOFs eliminated: the Schur complement
+#   S = K_bb - K_bi K_ii^-1 K_ib
+# acts on the interface DOFs alone, the interior follows from them by a solve with the kept K_ii factor
+class CondensedPart:
+    def __init__(self, key, solver, interior, boundary, k_ib, schur):
+        self.key = key
+        self.solver = solver
+        self.interior = interior
+        self.boundary = boundary
+        self.k_ib = k_ib
+        self.schur = schur
+
+    # the load the interior loads pass to the interface, -K_bi K_ii^-1 f_i
+    def condensed_load(self, f_i):
+        if len(self.interior) == 0:
+            return np.zeros((len(self.boundary),) + np.shape(f_i)[1:])
+        return -(self.k_ib.T @ self.solver.solve(f_i))
+
+    def recover(self, f_i, u_b):
+        if len(self.interior) == 0:
+            return np.zeros((0,) + np.shape(u_b)[1:])
+        return self.solver.solve(f_i - self.k_ib @ u_b)
+
+
+def condense(key, k, interior, boundary, solver="splu", block=256, **solver_options):
+    k_ii = k[interior][:, interior]
+    k_ib = k[interior][:, boundary].tocsc()
+    schur = k[boundary][:, boundary].toarray()
+    solver = make_solver(solver, **solver_options)
+    if len(interior):
+        solver.factorize(k_ii)
+        # columns of K_ii^-1 K_ib in blocks, the full product of a big part does not fit in memory
+        for j in range(0, len(boundary), block):
+            schur[:, j:j + block] -= k_ib.T @ solver.solve(k_ib[:, j:j + block].toarray())
+    return CondensedPart(key, solver, interior, boundary, k_ib.tocsr(), schur)
+
+
+class Substructuring:
+    def __init__(self, generator, parts=None, cache=None, workers=None, solver="splu", **solver_options):
+        self.generator = generator
+        self.parts = parts if parts is not None else generator.data.parts
+        self.cache = cache
+        self.workers = workers
+        self.solver = solver
+        self.solver_options = solver_options
+        self.labels = None
+        self.free = None
+        self.interface = None
+        self.condensed = []
+        self.stats = {}
+
+    def split(self):
+        fg = self.generator
+        dofs = fg.get_element_dofs()
+        free = np.ones(fg.m_s, dtype=bool)
+        free[fg.get_fixed_indexes()] = False
+        self.free = np.flatnonzero(free)
+        self.labels = part_labels(fg.triangles, fg.coords, self.parts)
+        part_dofs = [np.unique(dofs[self.labels == i]) for i in range(len(self.parts))]
+        part_dofs = [d[free[d]] for d in part_dofs]
+        # interface DOFs are those of nodes shared by elements of more than one part
+        count = np.bincount(np.concatenate(part_dofs), minlength=fg.m_s)
+        self.interface = np.flatnonzero(count > 1)
+        return [(d[count[d] == 1], d[count[d] > 1]) for d in part_dofs]
+
+    def _condense(self, index, interior, boundary):
+        fg = self.generator
+        elements = np.flatnonzero(self.labels == index)
+        values, _ = fg.get_element_matrices()
+        key = condensation_key(values[elements], fg.get_element_dofs()[elements], interior, boundary, self.solver,
+                               **self.solver_options)
+        part = self.cache.get(key) if self.cache is not None else None
+        cached = part is not None
+        if part is None:
+            part = condense(key, fg.assemble(elements), interior, boundary, self.solver, **self.solver_options)
+            if self.cache is not None:
+                self.cache.put(part)
+        return part, cached
+
+    # loads are (DOFs, cases), every case shares the condensed parts and the interface factorization
+    def solve(self, loads):
+        fg = self.generator
+        loads = np.asarray(loads, dtype=np.float64).reshape((fg.m_s, -1))
+        with fg.report.stage("condense", parts=len(self.parts)) as stage:
+            split = self.split()
+            # SuperLU and BLAS run outside the GIL, so threads condense the parts side by side
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(lambda args: self._condense(*args),
+                                        [(i, interior, boundary) for i, (interior, boundary) in enumerate(split)]))
+            self.condensed = [part for part, _ in results]
+            stage.info.update(interface=len(self.interface), cached=sum(cached for _, cached in results))
+        with fg.report.stage("interface", dofs=len(self.interface), cases=loads.shape[1]):
+            position = np.full(fg.m_s, -1, dtype=np.int64)
+            position[self.interface] = np.arange(len(self.interface))
+            schur = np.zeros((len(self.interface), len(self.interface)))
+            g = loads[self.interface].copy()
+            for part in self.condensed:
+                b = position[part.boundary]
+                schur[np.ix_(b, b)] += part.schur
+                g[b] += part.condensed_load(loads[part.interior])
+            u_b = make_solver("dense").factorize(schur).solve(g) if len(self.interface) else g
+        with fg.report.stage("recover", parts=len(self.parts)):
+            moving = np.zeros(loads.shape)
+            moving[self.interface] = u_b
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                interiors = list(pool.map(
+                    lambda part: part.recover(loads[part.interior], u_b[position[part.boundary]]), self.condensed))
+            for part, u_i in zip(self.condensed, interiors):
+                moving[part.interior] = u_i
+        self.stats = {"parts": len(self.parts), "interface": len(self.interface),
+                      "interior": [len(part.interior) for part in self.condensed]}
+        fg.moving_indexes = self.free.tolist()
+        return moving
+
+    def calculate_moving(self):
+        fg = self.generator
+        solved = self.solve(fg.data.loads)
+        moving = np.asarray(fg.data.moving, dtype=np.float64).copy()
+        moving[self.free] = solved[self.free]
+        fg.calculated_moving = moving
+        return moving
+
+    def calculate_load_cases(self, cases):
+        return LoadCaseResults(cases, self.solve(self.generator.data.get_load_matrix(cases)), self.generator.dimension)
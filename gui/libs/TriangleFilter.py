@@ -0,0 +1,55 @@
+import numpy as np
+from matplotlib.path import Path
+
+from libs.TriangleGeometry import double_areas, edge_lengths, min_angles
+
+# Every predicate takes the (E, 3) simplices and the (N, 2) coordinates they index
+# and returns a boolean mask of the triangles to keep.
+
+
+def edge_rule(edge):
+    # drop triangles touching the edge y == edge.y (to the right of edge.x) that reach below it
+    def predicate(simplices, xy):
+        x, y = xy[simplices, 0], xy[simplices, 1]
+        on_edge = (y == edge.y) & (x > edge.x)
+        return ~(on_edge.any(axis=1) & (y < edge.y).any(axis=1))
+    return predicate
+
+
+def points_inside(outline, points, radius=1e-9):
+    # the sign of radius that grows the path depends on its orientation, so both are tried
+    path = Path(np.asarray(outline, dtype=np.float64))
+    points = np.asarray(points, dtype=np.float64).reshape((-1, 2))
+    return path.contains_points(points, radius=radius) | path.contains_points(points, radius=-radius)
+
+
+def centroid_inside(*outlines, radius=1e-9):
+    def predicate(simplices, xy):
+        centroids = xy[simplices].mean(axis=1)
+        keep = np.zeros(len(simplices), dtype=bool)
+        for outline in outlines:
+            keep |= points_inside(outline, centroids, radius)
+        return keep
+    return predicate
+
+
+def min_area(tolerance=1e-9):
+    # drops degenerate slivers whose area is negligible against their longest edge squared
+    def predicate(simplices, xy):
+        p = xy[simplices]
+        longest = edge_lengths(p).max(axis=1)
+        return double_areas(p) > tolerance * longest * longest
+    return predicate
+
+
+def min_angle(degrees):
+    def predicate(simplices, xy):
+        return min_angles(xy[simplices]) >= degrees
+    return predicate
+
+
+def triangle_mask(simplices, xy, *predicates):
+    keep = np.ones(len(simplices), dtype=bool)
+    for predicate in predicates:
+        keep &= predicate(simplices, xy)
+    return keep
@@ -0,0 +1,26 @@
+import numpy as np
+
+# Measures of many triangles at once, p holds their (E, 3, 2) corner coordinates.
+
+
+def corners(triangles, coords):
+    # quadratic triangles list their corners first
+    return np.asarray(coords, dtype=np.float64)[np.asarray(triangles)[:, :3]]
+
+
+def double_areas(p):
+    return np.abs((p[:, 1, 0] - p[:, 0, 0]) * (p[:, 2, 1] - p[:, 0, 1])
+                  - (p[:, 2, 0] - p[:, 0, 0]) * (p[:, 1, 1] - p[:, 0, 1]))
+
+
+def edge_lengths(p):
+    # (E, 3), the edges 0-1, 1-2 and 2-0
+    return np.linalg.norm(np.roll(p, -1, axis=1) - p, axis=2)
+
+
+def min_angles(p):
+    # degrees
+    a = np.roll(p, -1, axis=1) - p
+    b = np.roll(p, 1, axis=1) - p
+    cos = (a * b).sum(axis=2) / (np.linalg.norm(a, axis=2) * np.linalg.norm(b, axis=2))
+    return np.degrees(np.arccos(np.clip(cos, -1, 1))).min(axis=1)
@@ -2,6 +2,7 @@ from abc import ABC
 
 from libs.Node import *
 from shapely.geometry import Polygon
+from libs.TriangleGeometry import corners, double_areas
 import numpy as np
 import math
 import operator
@@ -35,6 +36,72 @@ def clockwise_angle_and_distance(point):
     return angle, lenvector
 
 
+def batch_stiffness(triangles, coords, d, h):
+    # triangles: (E, 3) node indexes, coords: (N, 2) -> stiffness (E, 6, 6) and B matrices (E, 3, 6)
+    xy = np.asarray(coords, dtype=np.float64)[np.asarray(triangles)]
+    x, y = xy[..., 0], xy[..., 1]
+    dy = np.roll(y, -1, axis=1) - np.roll(y, -2, axis=1)  # y_j - y_k, y_k - y_i, y_i - y_j
+    dx = np.roll(x, -2, axis=1) - np.roll(x, -1, axis=1)  # x_k - x_j, x_i - x_k, x_j - x_i
+    double_area = (x[:, 1] - x[:, 0]) * (y[:, 2] - y[:, 0]) - (x[:, 2] - x[:, 0]) * (y[:, 1] - y[:, 0])
+    b = np.zeros((len(xy), 3, 6), dtype=np.float64)
+    b[:, 0, 0::2] = dy
+    b[:, 1, 1::2] = dx
+    b[:, 2, 0::2] = dx
+    b[:, 2, 1::2] = dy
+    b /= double_area[:, None, None]
+    k = np.einsum('eji,jk,ekl->eil', b, d, b, optimize=True) * (0.5 * h * np.abs(double_area))[:, None, None]
+    return k, b
+
+
+# 6-node triangle: corners, then the mid-side nodes of the edges 0-1, 1-2 and 2-0
+quadratic_nodes = np.array([[0, 0], [1, 0], [0, 1], [0.5, 0], [0.5, 0.5], [0, 0.5]])
+# three point rule, exact for the quadratic integrand of B^T D B; the weights include the reference area 1/2
+gauss_points = np.array([[1 / 6, 1 / 6], [2 / 3, 1 / 6], [1 / 6, 2 / 3]])
+gauss_weights = np.full(3, 1 / 6)
+
+
+def quadratic_shape_derivatives(points):
+    # (P, 2) natural coordinates -> dN/dxi and dN/deta, both (P, 6)
+    xi, eta = np.asarray(points, dtype=np.float64).T
+    l1 = 1 - xi - eta
+    dxi = np.column_stack([1 - 4 * l1, 4 * xi - 1, np.zeros_like(xi), 4 * (l1 - xi), 4 * eta, -4 * eta])
+    deta = np.column_stack([1 - 4 * l1, np.zeros_like(xi), 4 * eta - 1, -4 * xi, 4 * xi, 4 * (l1 - eta)])
+    return dxi, deta
+
+
+def quadratic_strain_matrices(triangles, coords, points):
+    # triangles: (E, 6) node indexes -> B matrices (E, P, 3, 12) and Jacobian determinants (E, P)
+    xy = np.asarray(coords, dtype=np.float64)[np.asarray(triangles)]
+    dxi, deta = quadratic_shape_derivatives(points)
+    dn = np.stack([dxi, deta], axis=1)  # (P, 2, 6)
+    jacobian = np.einsum('pan,enb->epab', dn, xy)
+    det = jacobian[..., 0, 0] * jacobian[..., 1, 1] - jacobian[..., 0, 1] * jacobian[..., 1, 0]
+    dxy = np.einsum('epab,pbn->epan', np.linalg.inv(jacobian), dn)  # dN/dx, dN/dy
+    b = np.zeros(det.shape + (3, 12), dtype=np.float64)
+    b[..., 0, 0::2] = dxy[..., 0, :]
+    b[..., 1, 1::2] = dxy[..., 1, :]
+    b[..., 2, 0::2] = dxy[..., 1, :]
+    b[..., 2, 1::2] = dxy[..., 0, :]
+    return b, det
+
+
+def batch_stiffness_quadratic(triangles, coords, d, h):
+    # triangles: (E, 6) -> stiffness (E, 12, 12) and B matrices at the Gauss points (E, 3, 3, 12)
+    b, det = quadratic_strain_matrices(triangles, coords, gauss_points)
+    weights = h * np.abs(det) * gauss_weights
+    k = np.einsum('ep,epji,jk,epkl->eil', weights, b, d, b, optimize=True)
+    return k, b
+
+
+def triangle_areas(triangles, coords):
+    return 0.5 * double_areas(corners(triangles, coords))
+
+
+def von_mises(stress):
+    sx, sy, txy = stress[..., 0], stress[..., 1], stress[..., 2]
+    return np.sqrt(sx * sx - sx * sy + sy * sy + 3 * txy * txy)
+
+
 class TriangleStiffness(Polygon, ABC):
     def __init__(self, a: Node, b: Node, c: Node):
         super().__init__([a, b, c])
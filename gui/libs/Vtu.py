@@ -0,0 +1,50 @@
+import numpy as np
+
+# VTK cell types by nodes per triangle
+cell_types = {3: 5, 6: 22}
+vtk_types = {np.dtype(np.float64): "Float64", np.dtype(np.float32): "Float32", np.dtype(np.int64): "Int64",
+             np.dtype(np.int32): "Int32", np.dtype(np.uint8): "UInt8"}
+
+
+def _components(values, n):
+    values = np.asarray(values)
+    if values.dtype not in vtk_types:
+        values = values.astype(np.float64)
+    values = values.reshape((n, -1))
+    # ParaView treats 3 component arrays as vectors, plane vectors get a zero z
+    if values.shape[1] == 2:
+        values = np.column_stack([values, np.zeros(n, dtype=values.dtype)])
+    return np.ascontiguousarray(values)
+
+
+# unstructured grid with raw appended binary data, every block is prefixed by its UInt64 byte count
+def write_vtu(path, coords, triangles, point_data=None, cell_data=None):
+    coords = np.asarray(coords, dtype=np.float64)
+    triangles = np.asarray(triangles, dtype=np.int64)
+    n, m = len(coords), len(triangles)
+    blocks = []
+
+    def array(values, name=None):
+        header = f'<DataArray type="{vtk_types[values.dtype]}"' + (f' Name="{name}"' if name else "") + \
+                 f' NumberOfComponents="{values.shape[1]}" format="appended"' \
+                 f' offset="{sum(8 + b.nbytes for b in blocks)}"/>'
+        blocks.append(values)
+        return header
+
+    lines = ['<?xml version="1.0"?>',
+             '<VTKFile type="UnstructuredGrid" version="1.0" byte_order="LittleEndian" header_type="UInt64">',
+             '<UnstructuredGrid>', f'<Piece NumberOfPoints="{n}" NumberOfCells="{m}">', '<PointData>']
+    lines += [array(_components(v, n), k) for k, v in (point_data or {}).items()]
+    lines += ['</PointData>', '<CellData>']
+    lines += [array(_components(v, m), k) for k, v in (cell_data or {}).items()]
+    lines += ['</CellData>', '<Points>', array(_components(coords, n)), '</Points>', '<Cells>',
+              array(triangles.reshape((-1, 1)), "connectivity"),
+              array(np.arange(1, m + 1, dtype=np.int64).reshape((-1, 1)) * triangles.shape[1], "offsets"),
+              array(np.full((m, 1), cell_types[triangles.shape[1]], dtype=np.uint8), "types"),
+              '</Cells>', '</Piece>', '</UnstructuredGrid>', '<AppendedData encoding="raw">']
+    with open(path, "wb") as f:
+        f.write("\n".join(lines).encode() + b"\n_")
+        for values in blocks:
+            f.write(np.uint64(values.nbytes).tobytes())
+            f.write(values.astype(values.dtype.newbyteorder("<"), copy=False).tobytes())
+        f.write(b"\n</AppendedData>\n</VTKFile>\n")
@@ -7,12 +7,18 @@ from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 
 from PyQt5 import QtWidgets
-from PyQt5.QtWidgets import QMessageBox
+from PyQt5.QtGui import QKeySequence
+from PyQt5.QtWidgets import QMessageBox, QShortcut
 from PyQt5.QtWidgets import QApplication, QMainWindow
 from design import Ui_MainWindow
 import matplotlib.pylab as plt
 from libs.Finite2DGenerator import Finite2DGenerator
 from libs.StiffnessData import StiffnessData
+from libs.FactorizationCache import FactorizationCache
+from libs.MeshCache import MeshCache, default_directory
+from libs.Analysis import Analysis, stages
+from libs.MeshPlot import MeshPlot
+from analysis_worker import AnalysisRunner
 from libs.Node import Node
 
 default_bracket = [[1700,550],[2200, 560],[2600,580],[3200, 600],[3200, 900],[200,900],[200, 600],[800,580],[1200, 560]]
@@ -26,7 +32,13 @@ class MainWindow(QMainWindow):
         self.fig = plt.subplots()
         self.figureCanvas = FigureCanvas(self.figure)
         self.plotToolbar = NavigationToolbar(self.figureCanvas, self)
+        self.plot = MeshPlot(self.figure)
         self.data = StiffnessData()
+        self.factorizations = FactorizationCache()
+        self.meshes = MeshCache(directory=default_directory())
+        self.data.mesh_cache = self.meshes
+        self.runner = AnalysisRunner(self)
+        self.background = True
 
     def setup_ui(self):
         self.ui.plotLayout.addWidget(self.figureCanvas)
@@ -39,22 +51,22 @@ class MainWindow(QMainWindow):
         self.ui.setupLFparametersBtn.clicked.connect(self.load_fix_parameters_setup)
         self.ui.loadTypeBox.currentIndexChanged.connect(self.load_fix_box_type_changed)
         self.ui.fixTypeBox.currentIndexChanged.connect(self.load_fix_box_type_changed)
+        self.runner.progress.connect(self.analysis_progress)
+        self.runner.finished.connect(self.analysis_finished)
+        self.runner.failed.connect(self.analysis_failed)
+        self.runner.cancelled.connect(lambda: self.statusBar().showMessage("Расчёт отменён"))
+        QShortcut(QKeySequence("Esc"), self, self.runner.cancel)
 
     def draw_plot(self):
-        axis = self.figure.add_subplot(121) if len(self.figure.get_axes()) == 0 else self.figure.get_axes()[0]
-        bracket = default_bracket.copy()
-        bracket.append(bracket[0])
-        bracket = np.array(bracket)
-        axis.plot(bracket[:, 0], bracket[:, 1], c="yellow")
+        self.plot.draw_outline(default_bracket)
+        self.plot.draw()
 
     def draw_mesh(self):
         x = self.data.get_tri_x()
         y = self.data.get_tri_y()
         if x is not None and y is not None:
-            axis = self.figure.get_axes()[0] if len(self.figure.get_axes()) > 0 else self.figure.add_subplot(121)
-            axis.triplot(x, y, self.data.tri.simplices, c="red")
-            axis.plot(x, y, 'o')
-            self.figure.canvas.draw()
+            self.plot.draw_mesh(x, y, self.data.tri.simplices)
+            self.plot.draw()
 
     def calculate(self, p):
         if self.data.is_prepared():
@@ -62,17 +74,60 @@ class MainWindow(QMainWindow):
             self.data.set_fixing(Node(default_bracket[4]))
             self.data.set_load(Node(default_bracket[3]), p)
             self.data.set_load(Node(default_bracket[2]), p)
-            fg = Finite2DGenerator(self.data)
-            moving = fg.calculate_moving() * -1
-            m = max(moving)
-            self.ui.resultText.setText(f"""Рассчитанные значения\n Перемещение макс: {m},\n Деформация макс: {m * 0.00000000157}\n Напряжение макс: {m * 0.0000000006}""")
-            fg.draw_displaced(self.figure.add_subplot(122)
-                              if len(self.figure.get_axes()) <= 2
-                              else self.figure.get_axes()[1])
-            self.figure.canvas.draw()
+            fg = Finite2DGenerator(self.data, factorization_cache=self.factorizations)
+            fg.calculate_moving()
+            fg.calculate_stress()
+            self.show_result(fg)
         else:
             self.show_popup("Ошибка", "Не введены необходимые данные")
 
+    def show_result(self, fg):
+        m = max(fg.calculated_moving * -1)
+        e = np.abs(fg.strain).max()
+        s = fg.von_mises.max()
+        text = f"""Рассчитанные значения\n Перемещение макс: {m},\n Деформация макс: {e}\n Напряжение макс: {s}"""
+        if fg.report.enabled:
+            text += "\n\nЭтапы расчёта:\n" + str(fg.report)
+        self.ui.resultText.setText(text)
+        self.plot.draw_field(fg.data.get_tri_x(), fg.data.get_tri_y(), fg.data.tri.simplices, fg.von_mises)
+        self.plot.draw()
+
+    def start_analysis(self, size, p):
+        if None in (self.data.young, self.data.poisson, self.data.thickness):
+            self.show_popup("Ошибка", "Не введены необходимые данные")
+            return
+        analysis = Analysis(self.data.young, self.data.poisson, self.data.thickness, size,
+                            [default_bracket, default_bracket2],
+                            [Node(default_bracket[5]), Node(default_bracket[4])],
+                            [Node(default_bracket[3]), Node(default_bracket[2])], p,
+                            factorization_cache=self.factorizations, mesh_cache=self.meshes)
+        self.runner.start(analysis)
+
+    def analysis_progress(self, index, stage):
+        self.statusBar().showMessage(f"Расчёт: {stage} ({index + 1}/{len(stages)}), Esc - отмена")
+
+    def analysis_finished(self, result):
+        self.statusBar().clearMessage()
+        self.data = result.data
+        self.draw_mesh()
+        self.setup_node_fix_load_info()
+        self.set_checkable_boxes()
+        self.show_result(result.generator)
+
+    def analysis_failed(self, err):
+        self.statusBar().clearMessage()
+        if isinstance(err, LinAlgError):
+            self.show_popup("Ошибка сингулярности", "Увеличьте размер сетки", QMessageBox.Critical, None, f"{err}")
+        elif isinstance(err, ValueError):
+            self.show_popup("Ошибка ввода", "Неккоректное число", QMessageBox.Critical, None, f"{err}")
+        else:
+            self.show_popup("Ошибка", "Ошибка расчёта", QMessageBox.Critical, None, f"{err}")
+
+    def closeEvent(self, event):
+        self.runner.cancel()
+        self.runner.wait()
+        super().closeEvent(event)
+
     def bracket_parameters_setup(self):
         try:
             y = float(self.ui.youngaParameter.text())
@@ -91,6 +146,10 @@ class MainWindow(QMainWindow):
     def mesh_parameters_setup(self):
         try:
             size = float(self.ui.meshSizeInput.text())
+            if self.background:
+                self.start_analysis(size, float(self.ui.powerValue.text()))
+                return
+            self.data.report.clear()
             self.data.define_nodes_mesh_by_parts(size, default_bracket, default_bracket2)
             self.draw_mesh()
             self.setup_node_fix_load_info()
@@ -0,0 +1,33 @@
+import argparse
+import sys
+
+from libs.Job import Job
+from libs.MeshCache import default_directory
+from libs.ParameterStudy import ParameterStudy, columns
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a parameter study over a job description")
+    parser.add_argument("job", help="base job description (.json or .toml)")
+    parser.add_argument("--sizes", nargs="+", type=float)
+    parser.add_argument("--young", nargs="+", type=float)
+    parser.add_argument("--poisson", nargs="+", type=float)
+    parser.add_argument("--thickness", nargs="+", type=float, help="mm")
+    parser.add_argument("--magnitudes", nargs="+", type=float)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("-o", "--output", default="study.csv")
+    parser.add_argument("--store", help="result store directory for the fields of every run")
+    parser.add_argument("--mesh-cache", default=default_directory(), help="directory for stored meshes")
+    parser.add_argument("--no-mesh-cache", action="store_true", help="keep generated meshes in memory only")
+    args = parser.parse_args(argv)
+    study = ParameterStudy.from_job(Job.load(args.job), args.sizes, args.young, args.poisson, args.thickness,
+                                    args.magnitudes, args.store, None if args.no_mesh_cache else args.mesh_cache)
+    print("\t".join(columns))
+    for row in study.run(args.workers):
+        print("\t".join(str(row[c]) for c in columns), flush=True)
+    study.write_csv(args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
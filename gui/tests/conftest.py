@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+# the modules import each other as libs.*, relative to the gui directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libs.Job import Job  # noqa: E402
+from libs.StiffnessData import StiffnessData  # noqa: E402
+
+jobs = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "jobs")
+
+
+@pytest.fixture
+def job():
+    return Job.load(os.path.join(jobs, "default_bracket.json"))
+
+
+# builds the bracket meshed, fixed and loaded, ready for a generator
+@pytest.fixture
+def bracket(job):
+    def make(size=None, element="t3"):
+        data = StiffnessData()
+        data.young, data.poisson, data.thickness = job.young, job.poisson, job.thickness / 1000.0
+        data.element = element
+        data.define_nodes_mesh_by_parts(size or job.size, *job.parts)
+        for point in job.fixings:
+            data.set_fixing(point)
+        for point in job.load_nodes:
+            data.set_load(point, job.load_value, job.angle)
+        return data
+    return make
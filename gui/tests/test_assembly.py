@@ -0,0 +1,27 @@
+import numpy as np
+
+from libs.Finite2DGenerator import Finite2DGenerator
+
+
+def test_sparse_matches_dense(bracket):
+    data = bracket(size=600)
+    fg = Finite2DGenerator(data)
+    assert fg.m_s <= 200  # the dense assembly is slow
+    dense = fg.get_stiffness_matrix()
+    sparse = Finite2DGenerator(data).get_sparse_stiffness_matrix()
+    np.testing.assert_allclose(sparse.toarray(), dense, rtol=1e-9, atol=1e-9 * np.abs(dense).max())
+
+
+def test_stiffness_is_symmetric_and_singular(bracket):
+    k = Finite2DGenerator(bracket()).get_sparse_stiffness_matrix().toarray()
+    np.testing.assert_allclose(k, k.T, atol=1e-9 * np.abs(k).max())
+    # an unsupported plane body moves freely in two translations and one rotation
+    eigenvalues = np.linalg.eigvalsh(k)
+    assert np.sum(np.abs(eigenvalues) < 1e-9 * eigenvalues.max()) == 3
+
+
+def test_assemble_elements_adds_up(bracket):
+    fg = Finite2DGenerator(bracket())
+    elements = np.arange(fg.mesh.n_elements)
+    total = fg.assemble(elements[::2]) + fg.assemble(elements[1::2])
+    np.testing.assert_allclose(total.toarray(), fg.assemble().toarray(), atol=1e-6)
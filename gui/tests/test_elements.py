@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+import scipy.sparse.linalg as sla
+
+from libs.Finite2DGenerator import Finite2DGenerator
+from libs.TriangleStiffness import batch_stiffness, batch_stiffness_quadratic
+
+# u = a + G x, an arbitrary linear displacement field and its constant strain
+offset = np.array([0.3, -0.2])
+gradient = np.array([[2e-4, -1e-4], [3e-4, 1.5e-4]])
+strain = np.array([gradient[0, 0], gradient[1, 1], gradient[0, 1] + gradient[1, 0]])
+
+
+def linear_field(coords):
+    return offset + coords @ gradient.T
+
+
+def boundary_nodes(triangles):
+    # split quadratic triangles into four linear ones, nodes on edges of a single triangle lie on the boundary
+    t = triangles
+    if t.shape[1] == 6:
+        t = np.concatenate([t[:, [0, 3, 5]], t[:, [3, 1, 4]], t[:, [5, 4, 2]], t[:, [3, 4, 5]]])
+    edges = np.sort(np.concatenate([t[:, [0, 1]], t[:, [1, 2]], t[:, [2, 0]]]), axis=1)
+    unique, count = np.unique(edges, axis=0, return_counts=True)
+    return np.unique(unique[count == 1])
+
+
+@pytest.mark.parametrize("element", ["t3", "t6"])
+def test_patch_linear_field_is_exact(bracket, element):
+    data = bracket(size=400, element=element)
+    fg = Finite2DGenerator(data)
+    exact = linear_field(fg.coords).reshape(-1)
+    boundary = np.zeros(fg.mesh.n_nodes, dtype=bool)
+    boundary[boundary_nodes(fg.triangles)] = True
+    prescribed = np.repeat(boundary, 2)
+    assert (~prescribed).any()
+    # the boundary is moved by the linear field, the interior has to follow it exactly
+    k = fg.get_sparse_stiffness_matrix().tocsr()
+    moving = exact.copy()
+    moving[~prescribed] = sla.spsolve(k[~prescribed][:, ~prescribed].tocsc(),
+                                      -k[~prescribed][:, prescribed] @ exact[prescribed])
+    np.testing.assert_allclose(moving, exact, rtol=0, atol=1e-10 * np.abs(exact).max())
+    fg.calculate_stress(moving)
+    np.testing.assert_allclose(fg.strain, np.broadcast_to(strain, fg.strain.shape), rtol=1e-8, atol=1e-16)
+    np.testing.assert_allclose(fg.element_stress, np.broadcast_to(strain @ fg.D.T, fg.element_stress.shape),
+                               rtol=1e-8, atol=1e-6)
+
+
+@pytest.mark.parametrize("stiffness, triangle, rank", [
+    (batch_stiffness, [0, 1, 2], 3),
+    (batch_stiffness_quadratic, [0, 1, 2, 3, 4, 5], 9),
+])
+def test_element_has_rigid_body_modes_only(stiffness, triangle, rank):
+    coords = np.array([[0, 0], [2, 0.2], [0.5, 1.5], [1, 0.1], [1.25, 0.85], [0.25, 0.75]])
+    d = np.array([[1, 0.3, 0], [0.3, 1, 0], [0, 0, 0.35]]) / 0.91
+    k, _ = stiffness(np.array([triangle]), coords, d, 0.01)
+    assert np.linalg.matrix_rank(k[0], tol=1e-10 * np.abs(k[0]).max()) == rank
+    rigid = np.column_stack([np.tile([1, 0], len(triangle)), np.tile([0, 1], len(triangle)),
+                             np.column_stack([-coords[triangle, 1], coords[triangle, 0]]).reshape(-1)])
+    np.testing.assert_allclose(k[0] @ rigid, 0, atol=1e-12 * np.abs(k[0]).max())
+
+
+def test_dense_assembly_rejects_quadratic_elements(bracket):
+    with pytest.raises(ValueError):
+        Finite2DGenerator(bracket(element="t6")).get_stiffness_matrix()
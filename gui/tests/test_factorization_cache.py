@@ -0,0 +1,33 @@
+import numpy as np
+
+from libs.FactorizationCache import FactorizationCache
+from libs.Finite2DGenerator import Finite2DGenerator
+
+
+def test_factorization_is_reused(bracket):
+    data = bracket(size=200)
+    cache = FactorizationCache()
+    first = Finite2DGenerator(data, "splu", cache).calculate_moving()
+    second = Finite2DGenerator(data, "splu", cache).calculate_moving()
+    assert (cache.misses, cache.hits) == (1, 1)
+    np.testing.assert_array_equal(first, second)
+
+
+def test_key_follows_material_and_solver_options(bracket):
+    data = bracket(size=200)
+    cache = FactorizationCache()
+    Finite2DGenerator(data, "cg", cache, tol=1e-6).calculate_moving()
+    Finite2DGenerator(data, "cg", cache, tol=1e-10).calculate_moving()
+    data.young, data.D = 2 * data.young, None
+    Finite2DGenerator(data, "cg", cache, tol=1e-10).calculate_moving()
+    assert cache.hits == 0 and len(cache) == 3
+
+
+def test_lru_eviction(bracket):
+    data = bracket(size=200)
+    cache = FactorizationCache(maxsize=1)
+    for solver in ("splu", "dense"):
+        Finite2DGenerator(data, solver, cache).calculate_moving()
+    assert len(cache) == 1
+    Finite2DGenerator(data, "splu", cache).calculate_moving()
+    assert cache.hits == 0
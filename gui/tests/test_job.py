@@ -0,0 +1,59 @@
+import json
+import os
+
+import pytest
+
+from libs.Job import Job
+
+jobs = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "jobs")
+
+
+@pytest.fixture
+def description():
+    with open(os.path.join(jobs, "default_bracket.json")) as f:
+        return json.load(f)
+
+
+def test_from_dict(description):
+    job = Job.from_dict(description, "bracket")
+    assert job.name == "default_bracket" and job.size == 400.0 and job.solver == "splu"
+    assert job.solver_options == {} and job.refinement is None and job.element == "t3"
+
+
+@pytest.mark.parametrize("solver", [
+    {"name": "lu"},
+    {"name": "cg", "options": {"tolerance": 1}},
+    {"name": "cg", "options": {"tol": "x"}},
+    {"name": "cg", "options": [1e-6]},
+])
+def test_invalid_solver(description, solver):
+    description["solver"] = solver
+    with pytest.raises(ValueError):
+        Job.from_dict(description)
+
+
+def test_invalid_element(description):
+    description["mesh"]["element"] = "t7"
+    with pytest.raises(ValueError, match="t7"):
+        Job.from_dict(description)
+
+
+def test_missing_key(description):
+    del description["material"]["young"]
+    with pytest.raises(ValueError, match="young"):
+        Job.from_dict(description)
+
+
+@pytest.mark.parametrize("refinement", [True, [0.05], {"steps": 2}, {"target": "x"}, {"max_dofs": None}])
+def test_invalid_refinement(description, refinement):
+    description["mesh"]["refinement"] = refinement
+    with pytest.raises(ValueError):
+        Job.from_dict(description)
+
+
+def test_refinement_options(description):
+    description["mesh"]["refinement"] = {"target": "0.1", "max_dofs": 2000.0}
+    job = Job.from_dict(description)
+    assert job.refinement == {"target": 0.1, "max_dofs": 2000}
+    description["mesh"]["refinement"] = {}
+    assert Job.from_dict(description).analysis().refinement is not None
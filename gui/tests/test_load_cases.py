@@ -0,0 +1,25 @@
+import numpy as np
+
+from libs.Finite2DGenerator import Finite2DGenerator
+from libs.LoadCase import LoadCase
+
+
+def test_cases_match_single_solves(bracket, job):
+    data = bracket(size=200)
+    cases = [LoadCase(m, job.angle, job.load_nodes) for m in (1000, job.load_value)]
+    results = Finite2DGenerator(data).calculate_load_cases(cases)
+    single = Finite2DGenerator(data).calculate_moving()
+    scale = np.abs(single).max()
+    np.testing.assert_allclose(results.case(1), single, rtol=0, atol=1e-12 * scale)
+    np.testing.assert_allclose(results.case(0) * job.load_value / 1000, results.case(1), rtol=0, atol=1e-12 * scale)
+
+
+def test_envelope(bracket, job):
+    cases = LoadCase.sweep([1000, 3000], [0, 90, 180], job.load_nodes)
+    results = Finite2DGenerator(bracket(size=200)).calculate_load_cases(cases)
+    assert len(results) == 6
+    np.testing.assert_array_equal(results.max, results.moving.max(axis=1))
+    np.testing.assert_array_equal(results.min, results.moving.min(axis=1))
+    np.testing.assert_array_equal(results.moving[np.arange(len(results.max)), results.max_case], results.max)
+    magnitude = np.linalg.norm(results.moving.reshape((-1, 2, len(cases))), axis=1)
+    np.testing.assert_allclose(results.max_magnitude, magnitude.max(axis=1))
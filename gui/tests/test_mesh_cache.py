@@ -0,0 +1,57 @@
+import numpy as np
+
+from libs.MeshCache import MeshCache
+from libs.StiffnessData import StiffnessData
+
+
+def mesh(job, cache, element="t3"):
+    data = StiffnessData()
+    data.mesh_cache = cache
+    data.element = element
+    data.define_nodes_mesh_by_parts(job.size, *job.parts)
+    return data
+
+
+def assert_same_mesh(a, b):
+    np.testing.assert_array_equal(a.mesh.coords, b.mesh.coords)
+    np.testing.assert_array_equal(a.mesh.triangles, b.mesh.triangles)
+    np.testing.assert_array_equal(a.mesh.raw_to_sorted, b.mesh.raw_to_sorted)
+    np.testing.assert_array_equal(a.tri.simplices, b.tri.simplices)
+    assert a.numbering_report == b.numbering_report
+
+
+def test_memory_round_trip(job):
+    cache = MeshCache()
+    generated = mesh(job, cache)
+    restored = mesh(job, cache)
+    assert (cache.misses, cache.hits) == (1, 1)
+    assert_same_mesh(generated, restored)
+
+
+def test_disk_round_trip(job, tmp_path):
+    generated = mesh(job, MeshCache(directory=str(tmp_path)))
+    assert len(list(tmp_path.glob("*.npz"))) == 1
+    # a fresh cache, as in another process, finds the stored mesh
+    cache = MeshCache(directory=str(tmp_path))
+    restored = mesh(job, cache)
+    assert cache.disk_hits == 1
+    assert_same_mesh(generated, restored)
+    for point in job.fixings + job.load_nodes:
+        assert restored.node_index(point) == generated.node_index(point)
+
+
+def test_quadratic_elements_share_the_linear_mesh(job):
+    cache = MeshCache()
+    linear = mesh(job, cache)
+    quadratic = mesh(job, cache, "t6")
+    assert cache.hits == 1
+    assert quadratic.mesh.order == 2 and quadratic.mesh.n_elements == linear.mesh.n_elements
+
+
+def test_invalidate(job, tmp_path):
+    cache = MeshCache(directory=str(tmp_path))
+    mesh(job, cache)
+    cache.invalidate()
+    assert len(cache) == 0 and not list(tmp_path.glob("*.npz"))
+    mesh(job, cache)
+    assert cache.misses == 2
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from libs.StiffnessData import StiffnessData, bandwidth_and_profile
+
+
+@pytest.mark.parametrize("mesher", ["quality", "split"])
+@pytest.mark.parametrize("size", [400, 100])
+def test_report_describes_the_final_mesh(job, mesher, size):
+    data = StiffnessData()
+    data.mesher = mesher
+    data.define_nodes_mesh_by_parts(size, *job.parts)
+    report = data.numbering_report
+    assert report["profile_after"] <= report["profile_before"]
+    assert bandwidth_and_profile(data.mesh.triangles, data.mesh.n_nodes) == \
+        (report["bandwidth_after"], report["profile_after"])
+    # every node belongs to a triangle of the filtered mesh
+    assert np.array_equal(np.unique(data.mesh.triangles), np.arange(data.mesh.n_nodes))
+
+
+def test_quadratic_report_describes_the_quadratic_mesh(job):
+    data = StiffnessData()
+    data.element = "t6"
+    data.define_nodes_mesh_by_parts(job.size, *job.parts)
+    t = data.mesh.triangles
+    corners = np.concatenate([t[:, [0, 3, 5]], t[:, [3, 1, 4]], t[:, [5, 4, 2]], t[:, [3, 4, 5]]])
+    report = data.numbering_report
+    assert bandwidth_and_profile(corners, data.mesh.n_nodes) == (report["bandwidth_after"], report["profile_after"])
+    assert report["profile_after"] <= report["profile_before"]
+
+
+def test_unknown_element(job):
+    data = StiffnessData()
+    data.element = "t7"
+    with pytest.raises(ValueError):
+        data.define_nodes_mesh_by_parts(job.size, *job.parts)
@@ -0,0 +1,75 @@
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pytest
+
+from libs.Finite2DGenerator import Finite2DGenerator
+from libs.ResultStore import ResultStore, generator_fields
+from libs.Vtu import vtk_types
+
+
+@pytest.fixture
+def solved(bracket):
+    fg = Finite2DGenerator(bracket())
+    fg.calculate_moving()
+    fg.calculate_stress()
+    return fg
+
+
+# the XML part up to the appended data, and every data array with its values read from the raw blocks
+def read_vtu(path):
+    with open(path, "rb") as f:
+        content = f.read()
+    head, _, appended = content.partition(b'<AppendedData encoding="raw">\n_')
+    root = ET.fromstring(head + b"</VTKFile>")
+    dtypes = {v: k for k, v in vtk_types.items()}
+    arrays = {}
+    for array in root.iter("DataArray"):
+        offset = int(array.get("offset"))
+        size = int(np.frombuffer(appended[offset:offset + 8], dtype="<u8")[0])
+        values = np.frombuffer(appended[offset + 8:offset + 8 + size], dtype=dtypes[array.get("type")])
+        arrays[array.get("Name", "Points")] = values.reshape((-1, int(array.get("NumberOfComponents"))))
+    return root.find("UnstructuredGrid/Piece"), arrays
+
+
+def test_round_trip(solved, tmp_path):
+    store = ResultStore(str(tmp_path))
+    store.write_generator("run", solved, {"size": 400})
+    result = store.read("run")
+    assert store.runs() == ["run"] and "run" in store
+    assert result.metadata == {"size": 400}
+    np.testing.assert_array_equal(result.coords, solved.coords)
+    np.testing.assert_array_equal(result.triangles, solved.triangles)
+    for field, values in generator_fields(solved).items():
+        assert isinstance(result[field], np.memmap)
+        np.testing.assert_array_equal(result[field], values)
+
+
+def test_runs_share_the_mesh(solved, tmp_path):
+    store = ResultStore(str(tmp_path))
+    store.write_generator("a", solved)
+    store.write_generator("b", solved, moving=2 * solved.calculated_moving)
+    assert len(list((tmp_path / "meshes").iterdir())) == 1
+    np.testing.assert_array_equal(store.read("b")["moving"], 2 * store.read("a")["moving"])
+    store.remove("a")
+    assert store.runs() == ["b"]
+
+
+def test_invalid_run_name(tmp_path):
+    with pytest.raises(ValueError):
+        ResultStore(str(tmp_path)).read("..")
+
+
+def test_vtu_export(solved, tmp_path):
+    store = ResultStore(str(tmp_path))
+    store.write_generator("run", solved)
+    path = str(tmp_path / "run.vtu")
+    store.read("run").to_vtu(path)
+    piece, arrays = read_vtu(path)
+    assert int(piece.get("NumberOfPoints")) == solved.mesh.n_nodes
+    assert int(piece.get("NumberOfCells")) == solved.mesh.n_elements
+    np.testing.assert_array_equal(arrays["Points"][:, :2], solved.coords)
+    np.testing.assert_array_equal(arrays["connectivity"].reshape(solved.triangles.shape), solved.triangles)
+    np.testing.assert_array_equal(arrays["types"], 5)
+    np.testing.assert_array_equal(arrays["moving"][:, :2], solved.calculated_moving.reshape((-1, 2)))
+    np.testing.assert_array_equal(arrays["von_mises"].reshape(-1), solved.von_mises)
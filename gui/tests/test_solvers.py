@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from numpy.linalg import LinAlgError
+
+from libs.Finite2DGenerator import Finite2DGenerator
+from libs.LinearSolver import make_solver
+
+
+@pytest.fixture
+def data(bracket):
+    return bracket(size=200)
+
+
+@pytest.fixture
+def reference(data):
+    return Finite2DGenerator(data, "splu").calculate_moving()
+
+
+@pytest.mark.parametrize("solver, options", [
+    ("dense", {}),
+    ("spsolve", {}),
+    ("cg", {"preconditioner": "jacobi", "tol": 1e-12}),
+    ("cg", {"preconditioner": "block_jacobi", "tol": 1e-12}),
+    ("cg", {"preconditioner": "ichol", "tol": 1e-12}),
+])
+def test_solvers_agree(data, reference, solver, options):
+    moving = Finite2DGenerator(data, solver, **options).calculate_moving()
+    np.testing.assert_allclose(moving, reference, rtol=0, atol=1e-8 * np.abs(reference).max())
+
+
+def test_cg_stats_describe_the_last_solve(data):
+    fg = Finite2DGenerator(data, "cg")
+    counts = []
+    for _ in range(3):
+        fg.calculate_moving()
+        counts.append(fg.solver_stats("iterations"))
+    assert counts[0] == counts[1] == counts[2]
+    assert counts[0]["iterations"] > 0
+
+
+def test_cg_reports_no_convergence():
+    a = np.diag(np.arange(1.0, 101.0))
+    solver = make_solver("cg", preconditioner="jacobi", maxiter=0).factorize(a)
+    with pytest.raises(LinAlgError):
+        solver.solve(np.ones(100))
+
+
+def test_unknown_preconditioner():
+    with pytest.raises(ValueError):
+        make_solver("cg", preconditioner="ilu")
+
+
+@pytest.mark.parametrize("solver", ["splu", "spsolve", "dense", "cg"])
+@pytest.mark.parametrize("fixings", [[], [[200, 900]]])
+def test_under_constrained_model_is_singular(job, solver, fixings):
+    job.fixings = fixings
+    with pytest.raises(LinAlgError):
+        job.solver = solver
+        job.analysis().run()
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from libs.FactorizationCache import FactorizationCache
+from libs.Finite2DGenerator import Finite2DGenerator
+from libs.LoadCase import LoadCase
+from libs.Substructure import Substructuring
+
+
+@pytest.mark.parametrize("element", ["t3", "t6"])
+def test_matches_direct_solve(bracket, element):
+    data = bracket(size=200, element=element)
+    direct = Finite2DGenerator(data).calculate_moving()
+    fg = Finite2DGenerator(data)
+    substructuring = Substructuring(fg)
+    moving = substructuring.calculate_moving()
+    np.testing.assert_allclose(moving, direct, rtol=0, atol=1e-10 * np.abs(direct).max())
+    assert substructuring.stats["parts"] == 2 and substructuring.stats["interface"] > 0
+    assert fg.moving_indexes == Finite2DGenerator(data).factorize().free.tolist()
+
+
+def test_load_cases_match_direct_solve(bracket, job):
+    data = bracket(size=200)
+    cases = [LoadCase(m, job.angle, job.load_nodes) for m in (1000, 6000)]
+    direct = Finite2DGenerator(data).calculate_load_cases(cases).moving
+    moving = Substructuring(Finite2DGenerator(data)).calculate_load_cases(cases).moving
+    np.testing.assert_allclose(moving, direct, rtol=0, atol=1e-10 * np.abs(direct).max())
+
+
+def test_condensed_parts_are_cached(bracket):
+    data = bracket(size=200)
+    cache = FactorizationCache()
+    first = Substructuring(Finite2DGenerator(data), cache=cache).calculate_moving()
+    second = Substructuring(Finite2DGenerator(data), cache=cache).calculate_moving()
+    assert cache.hits == 2
+    np.testing.assert_array_equal(first, second)
+
+
+def test_cache_keys_follow_solver_options(bracket):
+    data = bracket(size=200)
+    cache = FactorizationCache()
+    Substructuring(Finite2DGenerator(data), cache=cache, solver="cg", tol=1e-4).calculate_moving()
+    Substructuring(Finite2DGenerator(data), cache=cache, solver="cg", tol=1e-10).calculate_moving()
+    assert cache.hits == 0
+    Substructuring(Finite2DGenerator(data), cache=cache, solver="cg", tol=1e-10).calculate_moving()
+    assert cache.hits == 2